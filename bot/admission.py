@@ -0,0 +1,112 @@
+import asyncio
+import logging
+
+import lavalink
+from lavalink.stats import Stats
+
+import metrics
+
+logger = logging.getLogger("bot.admission")
+
+# Lavalink sends 50 frames per second to every playing player
+FRAMES_PER_MINUTE = 3000
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        client: lavalink.Client,
+        *,
+        max_cpu_load: float = 0.9,
+        max_frame_deficit: float = 0.05,
+        large_playlist: int = 100,
+        refresh_interval: float = 10.0,
+    ):
+        self.client = client
+        self.max_cpu_load = max_cpu_load
+        self.max_frame_deficit = max_frame_deficit
+        self.large_playlist = large_playlist
+        self.refresh_interval = refresh_interval
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        # Lavalink pushes stats only once a minute, which is too coarse to react to a spike
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self.watch())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def refresh(self):
+        for node in self.client.node_manager.available_nodes:
+            try:
+                data = await node.get_stats()
+            except Exception as e:
+                logger.debug(f"[Admission] Failed to refresh stats of {node.name}: {e}")
+                continue
+
+            # The REST endpoint has no frame stats, those only come with the websocket stats
+            if not data.get("frameStats"):
+                stats = node.stats
+                data["frameStats"] = {
+                    "sent": stats.frames_sent,
+                    "nulled": stats.frames_nulled,
+                    "deficit": stats.frames_deficit,
+                }
+            try:
+                node.stats = Stats(node, data)
+            except Exception as e:
+                logger.debug(f"[Admission] Failed to refresh stats of {node.name}: {e}")
+
+    def overload_reason(self, node: lavalink.Node) -> str | None:
+        stats = node.stats
+        if stats.is_fake:
+            return None
+        if stats.system_load >= self.max_cpu_load:
+            return "cpu"
+        if stats.playing_players and stats.frames_deficit / FRAMES_PER_MINUTE >= self.max_frame_deficit:
+            return "frame_deficit"
+        return None
+
+    def healthy_nodes(self) -> list[lavalink.Node]:
+        return [node for node in self.client.node_manager.available_nodes if self.overload_reason(node) is None]
+
+    def select_node(self) -> lavalink.Node | None:
+        nodes = self.healthy_nodes()
+        if not nodes:
+            return None
+        return min(nodes, key=lambda node: node.penalty)
+
+    def admit_player(self) -> bool:
+        if self.healthy_nodes():
+            return True
+
+        reasons = {self.overload_reason(node) for node in self.client.node_manager.available_nodes}
+        for reason in reasons:
+            metrics.admission_rejections.labels(reason).inc()
+        logger.warning(f"[Admission] Rejected a new player, nodes are overloaded ({', '.join(sorted(reasons))})")
+        return False
+
+    def admit_playlist(self, node: lavalink.Node, size: int) -> bool:
+        if size <= self.large_playlist:
+            return True
+
+        reason = self.overload_reason(node)
+        if reason is None:
+            return True
+
+        metrics.admission_rejections.labels(f"playlist_{reason}").inc()
+        logger.warning(f"[Admission] Rejected a playlist of {size} tracks, {node.name} is overloaded ({reason})")
+        return False
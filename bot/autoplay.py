@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("bot.autoplay")
+
+
+# Counts, per guild, which track was played right after which, keeping only the top candidates of each track
+class PlayedAfterIndex:
+    def __init__(
+        self,
+        database,
+        *,
+        top_k: int = 10,
+        max_tracks: int = 5000,
+        recent: int = 20,
+        save_interval: float = 60,
+        queue_size: int = 10000,
+    ):
+        self.database = database
+        self.top_k = top_k
+        self.max_tracks = max_tracks
+        self.save_interval = save_interval
+        self._recent_size = recent
+        self._edges: dict[int, OrderedDict[str, dict[str, int]]] = {}
+        self._last: dict[int, str] = {}
+        self._recent: dict[int, deque[str]] = {}
+        self._dirty: dict[int, set[str]] = {}
+        self._events: asyncio.Queue[tuple[int, str | None, bool]] = asyncio.Queue(queue_size)
+        self._task: asyncio.Task | None = None
+        self._save_task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        for task in (self._task, self._save_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._save_task = None
+        await self.save()
+
+    def record(self, guild_id: int, uri: str, *, learn: bool = True):
+        # Called from the playback event handlers, so the work is handed off to the background task
+        try:
+            self._events.put_nowait((guild_id, uri, learn))
+        except asyncio.QueueFull:
+            logger.debug("[Autoplay] Dropped a playback event, the index is falling behind")
+
+    def reset(self, guild_id: int):
+        # Queued behind the pending events, so the last track of the previous session is never linked to the next one
+        try:
+            self._events.put_nowait((guild_id, None, False))
+        except asyncio.QueueFull:
+            self._last.pop(guild_id, None)
+
+    async def run(self):
+        while True:
+            guild_id, uri, learn = await self._events.get()
+            if uri is None:
+                self._last.pop(guild_id, None)
+                continue
+            try:
+                if guild_id not in self._edges:
+                    await self.load(guild_id)
+                self.apply(guild_id, uri, learn)
+            except Exception:
+                logger.exception("[Autoplay] Failed to update the played-after index")
+
+            if self._dirty and self._save_task is None:
+                self._save_task = asyncio.create_task(self.save_later())
+
+    async def load(self, guild_id: int):
+        documents = await self.database.get_played_after(guild_id)
+        edges = OrderedDict()
+        for uri, candidates in documents.items():
+            edges[uri] = dict(candidates)
+        self._edges[guild_id] = edges
+
+    def apply(self, guild_id: int, uri: str, learn: bool = True):
+        recent = self._recent.setdefault(guild_id, deque(maxlen=self._recent_size))
+        recent.append(uri)
+
+        previous = self._last.get(guild_id)
+        self._last[guild_id] = uri
+        # Autoplayed tracks still move the cursor, but learning from them would only reinforce the index's own picks
+        if previous is None or previous == uri or not learn:
+            return
+
+        edges = self._edges[guild_id]
+        candidates = edges.get(previous)
+        if candidates is None:
+            candidates = edges[previous] = {}
+            if len(edges) > self.max_tracks:
+                evicted, _ = edges.popitem(last=False)
+                self._dirty.get(guild_id, set()).discard(evicted)
+        else:
+            edges.move_to_end(previous)
+
+        candidates[uri] = candidates.get(uri, 0) + 1
+        # Pruning only once the list doubles keeps the amortized cost per event constant
+        if len(candidates) > self.top_k * 2:
+            top = sorted(candidates.items(), key=lambda item: item[1], reverse=True)[: self.top_k]
+            edges[previous] = candidates = dict(top)
+
+        self._dirty.setdefault(guild_id, set()).add(previous)
+
+    def next(self, guild_id: int, uri: str | None = None) -> str | None:
+        edges = self._edges.get(guild_id)
+        uri = uri or self._last.get(guild_id)
+        if edges is None or uri is None:
+            return None
+
+        candidates = edges.get(uri)
+        if not candidates:
+            return None
+
+        # At most 2 * top_k candidates are scanned, independent of the history size
+        recent = self._recent.get(guild_id, ())
+        best, best_count = None, 0
+        for candidate, count in candidates.items():
+            if count > best_count and candidate not in recent:
+                best, best_count = candidate, count
+        if best is None:
+            # Everything was played recently, repeating the strongest candidate beats stopping
+            best = max(candidates, key=candidates.get)
+        return best
+
+    async def save_later(self):
+        await asyncio.sleep(self.save_interval)
+        self._save_task = None
+        await self.save()
+
+    async def save(self):
+        dirty, self._dirty = self._dirty, {}
+        for guild_id, uris in dirty.items():
+            edges = self._edges.get(guild_id, {})
+            entries = {
+                uri: sorted(edges[uri].items(), key=lambda item: item[1], reverse=True)[: self.top_k]
+                for uri in uris
+                if uri in edges
+            }
+            if not entries:
+                continue
+            try:
+                await self.database.save_played_after(guild_id, entries)
+            except Exception:
+                logger.exception("[Autoplay] Failed to save the played-after index")
+                self._dirty.setdefault(guild_id, set()).update(uris)
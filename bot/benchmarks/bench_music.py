@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bson  # noqa: E402
+import discord  # noqa: E402
+from lavalink import AudioTrack  # noqa: E402
+from lavalink.events import TrackStartEvent  # noqa: E402
+
+import runtime  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    FakeLavalinkServer,
+    InMemoryDatabase,
+    make_track,
+)
+from benchmarks.harness import Harness, environment, summarize  # noqa: E402
+from cogs.music import Music  # noqa: E402
+from models import PlayCommandHistory, Track, encode_track  # noqa: E402
+from player import LazyTrack  # noqa: E402
+
+
+async def bench_play(harness: Harness, guilds: int, concurrency: int, query: str) -> dict:
+    bot = harness.bot
+    targets = [bot.create_guild(members=2) for _ in range(guilds)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: dict[str, list[float]] = {"idle": [], "queued": []}
+
+    async def play(guild, phase: str):
+        interaction = bot.create_interaction(guild)
+        async with semaphore:
+            start = time.perf_counter()
+            await Music.play.callback(harness.music, interaction, query)
+            latencies[phase].append(time.perf_counter() - start)
+
+    results = {}
+    for phase in ("idle", "queued"):
+        start = time.perf_counter()
+        await asyncio.gather(*(play(guild, phase) for guild in targets))
+        elapsed = time.perf_counter() - start
+        results[phase] = {**summarize(latencies[phase]), "throughput_per_s": round(guilds / elapsed, 1)}
+        # Let the TrackStartEvents of this round settle before the next one
+        await asyncio.sleep(harness.server.start_delay + 0.1)
+
+    return results
+
+
+async def bench_on_track_start(harness: Harness, iterations: int) -> dict:
+    bot = harness.bot
+    guild = bot.create_guild()
+    interaction = bot.create_interaction(guild)
+    await Music.play.callback(harness.music, interaction, "https://example.com/track")
+    await asyncio.sleep(harness.server.start_delay + 0.1)
+
+    player = harness.music.get_player(guild.id)
+    samples = []
+    for _ in range(iterations):
+        event = TrackStartEvent(player, player.current)
+        start = time.perf_counter()
+        await harness.music.on_track_start(event)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_translation(harness: Harness, iterations: int) -> dict:
+    translator = harness.bot.tree.translator
+    locale = discord.Locale.korean
+    kwargs = {"name": "Benchmark Track"}
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        translator.render("message.play.track", locale, kwargs)
+    render = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        translator.render_cached("message.play.track", locale, kwargs)
+    cached = (time.perf_counter() - start) / iterations
+
+    return {"render_us": round(render * 1e6, 3), "render_cached_us": round(cached * 1e6, 3)}
+
+
+def bench_serialization(playlist_size: int, iterations: int) -> dict:
+    tracks = [AudioTrack(make_track(index), requester=1) for index in range(playlist_size)]
+    data = {
+        "channel_id": 1,
+        "interaction_id": 1,
+        "message_id": 1,
+        "user_id": 1,
+        "query": "benchmark",
+        "load_type": "playlist",
+        "tracks": tracks,
+    }
+
+    def measure(encode) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            encode()
+        return round((time.perf_counter() - start) / iterations * 1e6, 3)
+
+    def copy_tracks():
+        # What the history writer did before encode_track, a model instance per track copied by asdict
+        return [
+            asdict(
+                Track(
+                    f"{track.source_name}:{track.identifier}",
+                    track.source_name,
+                    track.identifier,
+                    track.title,
+                    track.author,
+                    track.duration,
+                    track.uri,
+                    track.track,
+                )
+            )
+            for track in tracks
+        ]
+
+    history = PlayCommandHistory.from_dict(data)
+    return {
+        "playlist_size": playlist_size,
+        "from_dict_us": measure(lambda: PlayCommandHistory.from_dict(data)),
+        "asdict_us": measure(lambda: asdict(history)),
+        "to_document_us": measure(history.to_document),
+        "track_documents_asdict_us": measure(copy_tracks),
+        "track_documents_encode_us": measure(lambda: [encode_track(track) for track in tracks]),
+        "bson_encode_us": measure(lambda: bson.encode(history.to_document())),
+    }
+
+
+def bench_json(iterations: int) -> dict:
+    locale = (Path(__file__).resolve().parent.parent / "locales" / "ko-KR.json").read_bytes()
+    record = {
+        "trace_id": "1234567890",
+        "name": "play",
+        "started_at": "2026-01-01T00:00:00+00:00",
+        "duration_ms": 123.456,
+        "spans": [{"name": f"span{index}", "offset_ms": index * 1.5, "duration_ms": 1.25} for index in range(8)],
+    }
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        runtime.loads(locale)
+    loads = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        runtime.dumps(record)
+    dumps = (time.perf_counter() - start) / iterations
+
+    return {"locale_loads_us": round(loads * 1e6, 3), "trace_dumps_us": round(dumps * 1e6, 3)}
+
+
+class GcMonitor:
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pauses: list[float] = []
+        self._start = 0.0
+
+    def __call__(self, phase: str, info: dict):
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.collections[info["generation"]] += 1
+            self.pauses.append(time.perf_counter() - self._start)
+
+    def report(self) -> dict:
+        return {
+            "collections": self.collections,
+            "pause_total_ms": round(sum(self.pauses) * 1000, 3),
+            "pause_max_ms": round(max(self.pauses, default=0) * 1000, 3),
+            "frozen_objects": gc.get_freeze_count(),
+        }
+
+
+def measure_allocations(factory) -> int:
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = factory()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    del keep
+    return after - before
+
+
+def bench_memory(harness: Harness, players: int, tracks: int) -> dict:
+    player_manager = harness.bot.lavalink.player_manager
+    first_guild_id = 10**17
+
+    tracemalloc.start()
+    try:
+        player_bytes = measure_allocations(
+            lambda: [player_manager.create(first_guild_id + index) for index in range(players)]
+        )
+        player = player_manager.get(first_guild_id)
+
+        def queue_tracks():
+            # The raw payload stays referenced by AudioTrack.raw, so it is part of the per-track cost
+            for index in range(tracks):
+                track = AudioTrack(make_track(index), requester=1, query="benchmark", interaction_id=1, message_id=1)
+                player.add(track, requester=1)
+
+        track_bytes = measure_allocations(queue_tracks)
+        player.queue.clear()
+
+        def queue_lazy_tracks():
+            context = {"query": "benchmark", "interaction_id": 1, "message_id": 1}
+            for index in range(tracks):
+                track = LazyTrack(AudioTrack(make_track(index)), context)
+                player.add(track, requester=1)
+
+        lazy_track_bytes = measure_allocations(queue_lazy_tracks)
+    finally:
+        tracemalloc.stop()
+        for index in range(players):
+            player_manager.remove(first_guild_id + index)
+
+    return {
+        "bytes_per_player": round(player_bytes / players),
+        "bytes_per_queued_track": round(track_bytes / tracks),
+        "bytes_per_lazy_queued_track": round(lazy_track_bytes / tracks),
+    }
+
+
+async def run(args) -> dict:
+    server = FakeLavalinkServer(
+        load_latency=args.load_latency,
+        start_delay=args.start_delay,
+        playlist_size=args.playlist_size,
+    )
+    harness = Harness(server=server, database=InMemoryDatabase(latency=args.database_latency))
+    await harness.start()
+    runtime.freeze()
+    monitor = GcMonitor()
+    gc.callbacks.append(monitor)
+    try:
+        report = {
+            "environment": {**environment(), "loop": type(asyncio.get_running_loop()).__module__},
+            "config": vars(args),
+            "play": await bench_play(harness, args.guilds, args.concurrency, args.query),
+            "on_track_start": await bench_on_track_start(harness, args.iterations),
+            "translation": bench_translation(harness, args.iterations * 10),
+            "json": bench_json(args.iterations),
+            "serialization": bench_serialization(args.serialization_tracks, args.iterations),
+            # Measured before the memory benchmark, whose explicit collections would dominate the pauses
+            "gc": monitor.report(),
+            "memory": bench_memory(harness, args.memory_players, args.memory_tracks),
+            "lavalink_requests": dict(server.requests),
+        }
+    finally:
+        gc.callbacks.remove(monitor)
+        await harness.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--guilds", type=int, default=200, help="Number of guilds issuing /play")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum concurrent /play invocations")
+    parser.add_argument("--query", default="benchmark query", help="Query passed to /play")
+    parser.add_argument("--iterations", type=int, default=1000, help="Iterations for the micro benchmarks")
+    parser.add_argument("--load-latency", type=float, default=0.05, help="Fake Lavalink loadtracks latency")
+    parser.add_argument("--start-delay", type=float, default=0.01, help="Delay before the fake TrackStartEvent")
+    parser.add_argument("--database-latency", type=float, default=0.001, help="Latency of the in-memory database")
+    parser.add_argument("--playlist-size", type=int, default=100, help="Tracks returned for playlist queries")
+    parser.add_argument("--memory-players", type=int, default=1000, help="Players created for the memory benchmark")
+    parser.add_argument("--memory-tracks", type=int, default=5000, help="Tracks queued for the memory benchmark")
+    parser.add_argument("--runtime-profile", choices=["default", "performance"], default="default")
+    parser.add_argument(
+        "--gc-thresholds", type=int, nargs=3, default=[50_000, 20, 100], help="GC thresholds of the performance profile"
+    )
+    parser.add_argument(
+        "--serialization-tracks", type=int, default=1000, help="Playlist size for the serialization benchmark"
+    )
+
+    args = parser.parse_args()
+
+    runtime.configure(args.runtime_profile, gc_thresholds=tuple(args.gc_thresholds))
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=4)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCHMARK = Path(__file__).resolve().parent / "bench_music.py"
+PROFILES = ("default", "performance")
+
+
+def flatten(report: dict, prefix: str = "") -> dict[str, float]:
+    values = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def run_profile(profile: str, arguments: list[str]) -> dict:
+    # Each profile runs in its own interpreter, the event loop policy and the GC state cannot be undone in-process
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / f"{profile}.json"
+        subprocess.run(
+            [sys.executable, str(BENCHMARK), "--runtime-profile", profile, "-o", str(output), *arguments], check=True
+        )
+        return json.loads(output.read_text(encoding="utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run bench_music.py once per runtime profile and compare the results")
+
+    parser.add_argument("-o", "--output", help="Write both JSON reports to this file")
+    parser.add_argument("arguments", nargs=argparse.REMAINDER, help="Arguments passed through to bench_music.py")
+
+    args = parser.parse_args()
+    arguments = args.arguments[1:] if args.arguments[:1] == ["--"] else args.arguments
+
+    reports = {profile: run_profile(profile, arguments) for profile in PROFILES}
+    baseline = flatten({k: v for k, v in reports["default"].items() if k != "config"})
+    candidate = flatten({k: v for k, v in reports["performance"].items() if k != "config"})
+
+    print(f"{'metric':<48}{'default':>14}{'performance':>14}{'ratio':>9}")
+    for name, value in baseline.items():
+        if name not in candidate:
+            continue
+        ratio = f"{candidate[name] / value:.2f}x" if value else ""
+        print(f"{name:<48}{value:>14}{candidate[name]:>14}{ratio:>9}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=4) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,550 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import itertools
+import random
+from collections import defaultdict
+from types import SimpleNamespace
+
+import discord
+from aiohttp import web
+from discord.enums import InteractionResponseType
+
+_snowflakes = itertools.count(1_000_000_000_000_000)
+
+
+def snowflake() -> int:
+    return next(_snowflakes)
+
+
+def make_track(index: int, *, source_name: str = "youtube", duration: int = 215_000) -> dict:
+    identifier = f"bench{index:07d}"
+    # Real encoded tracks are a few hundred bytes of base64, keep the payload size in the same ballpark
+    encoded = base64.b64encode(f"{identifier}:{source_name}".encode().ljust(240, b"\0")).decode()
+    return {
+        "encoded": encoded,
+        "info": {
+            "identifier": identifier,
+            "isSeekable": True,
+            "author": f"Artist {index % 97}",
+            "length": duration,
+            "isStream": False,
+            "position": 0,
+            "title": f"Benchmark Track {index}",
+            "uri": f"https://www.youtube.com/watch?v={identifier}",
+            "artworkUrl": None,
+            "isrc": None,
+            "sourceName": source_name,
+        },
+        "pluginInfo": {},
+        "userData": {},
+    }
+
+
+class FakeLavalinkServer:
+    def __init__(
+        self,
+        *,
+        password: str = "youshallnotpass",
+        load_latency: float = 0.05,
+        update_latency: float = 0.002,
+        start_delay: float = 0.01,
+        search_results: int = 5,
+        playlist_size: int = 100,
+    ):
+        self.password = password
+        self.load_latency = load_latency
+        self.update_latency = update_latency
+        self.start_delay = start_delay
+        self.search_results = search_results
+        self.playlist_size = playlist_size
+        self.session_id = "benchmark"
+        self.requests: defaultdict[str, int] = defaultdict(int)
+        self.stats = {
+            "players": 0,
+            "playingPlayers": 0,
+            "uptime": 0,
+            "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+            "cpu": {"cores": 4, "systemLoad": 0.1, "lavalinkLoad": 0.05},
+            "frameStats": {"sent": 3000, "nulled": 0, "deficit": 0},
+        }
+        self.port: int | None = None
+        self._players: set[str] = set()
+        self._runner: web.AppRunner | None = None
+        self._sockets: set[web.WebSocketResponse] = set()
+        self._track_index = itertools.count()
+
+    def _authorized(self, request: web.Request) -> bool:
+        return request.headers.get("Authorization") == self.password
+
+    def _tracks(self, count: int) -> list[dict]:
+        return [make_track(next(self._track_index)) for _ in range(count)]
+
+    def load_result(self, identifier: str) -> dict:
+        if "empty" in identifier:
+            return {"loadType": "empty", "data": {}}
+        if "error" in identifier:
+            return {"loadType": "error", "data": {"message": "Benchmark error", "severity": "common", "cause": ""}}
+        if identifier.startswith("ytsearch:"):
+            return {"loadType": "search", "data": self._tracks(self.search_results)}
+        if "playlist" in identifier:
+            return {
+                "loadType": "playlist",
+                "data": {
+                    "info": {"name": "Benchmark Playlist", "selectedTrack": -1},
+                    "pluginInfo": {},
+                    "tracks": self._tracks(self.playlist_size),
+                },
+            }
+        return {"loadType": "track", "data": self._tracks(1)[0]}
+
+    async def handle_websocket(self, request: web.Request):
+        if not self._authorized(request):
+            return web.Response(status=401)
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        await ws.send_json({"op": "ready", "resumed": False, "sessionId": self.session_id})
+        await ws.send_json({"op": "stats", **self.stats})
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self._sockets.discard(ws)
+        return ws
+
+    async def handle_load_tracks(self, request: web.Request):
+        self.requests["loadtracks"] += 1
+        await asyncio.sleep(self.load_latency)
+        return web.json_response(self.load_result(request.query.get("identifier", "")))
+
+    async def handle_update_player(self, request: web.Request):
+        self.requests["update_player"] += 1
+        guild_id = request.match_info["guild_id"]
+        data = await request.json()
+        await asyncio.sleep(self.update_latency)
+
+        self._players.add(guild_id)
+        track = data.get("track")
+        if track and track.get("encoded"):
+            asyncio.get_running_loop().call_later(
+                self.start_delay, lambda: asyncio.ensure_future(self.send_event(guild_id, "TrackStartEvent"))
+            )
+
+        return web.json_response(
+            {
+                "guildId": guild_id,
+                "track": None,
+                "volume": data.get("volume", 100),
+                "paused": data.get("paused", False),
+                "state": {"time": 0, "position": 0, "connected": True, "ping": 0},
+                "voice": data.get("voice", {}),
+                "filters": data.get("filters", {}),
+            }
+        )
+
+    async def handle_destroy_player(self, request: web.Request):
+        self.requests["destroy_player"] += 1
+        self._players.discard(request.match_info["guild_id"])
+        return web.Response(status=204)
+
+    async def handle_stats(self, request: web.Request):
+        return web.json_response(self.stats)
+
+    async def handle_update_session(self, request: web.Request):
+        return web.json_response({"resuming": False, "timeout": 60})
+
+    async def send_event(self, guild_id: str, event_type: str, **data):
+        payload = {"op": "event", "type": event_type, "guildId": guild_id, **data}
+        if event_type == "TrackStartEvent":
+            payload.setdefault("track", {})
+        for ws in list(self._sockets):
+            await ws.send_json(payload)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        app = web.Application()
+        app.router.add_get("/v4/websocket", self.handle_websocket)
+        app.router.add_get("/v4/loadtracks", self.handle_load_tracks)
+        app.router.add_get("/v4/stats", self.handle_stats)
+        app.router.add_patch("/v4/sessions/{session_id}/players/{guild_id}", self.handle_update_player)
+        app.router.add_delete("/v4/sessions/{session_id}/players/{guild_id}", self.handle_destroy_player)
+        app.router.add_patch("/v4/sessions/{session_id}", self.handle_update_session)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for ws in list(self._sockets):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class InMemoryDatabase:
+    def __init__(self, *, latency: float = 0.0):
+        self.latency = latency
+        self.channel_volumes: dict[int, int] = {}
+        self.default_volumes: dict[int, int] = {}
+        self.dedicated_channels: dict[int, int] = {}
+        self.panel_messages: dict[int, int] = {}
+        self.played_after: dict[int, dict[str, list[tuple[str, int]]]] = {}
+        self.guild_rollups: dict[tuple, dict] = {}
+        self.track_rollups: dict[tuple, dict] = {}
+        self.history: defaultdict[str, dict] = defaultdict(dict)
+
+    async def _wait(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def close(self):
+        pass
+
+    async def set_channel_volume(self, channel_id: int, volume: int):
+        await self._wait()
+        self.channel_volumes[channel_id] = volume
+
+    async def get_channel_volume(self, channel_id: int) -> int | None:
+        await self._wait()
+        return self.channel_volumes.get(channel_id)
+
+    async def set_default_volume(self, guild_id: int, volume: int):
+        await self._wait()
+        self.default_volumes[guild_id] = volume
+
+    async def get_default_volume(self, guild_id: int) -> int | None:
+        await self._wait()
+        return self.default_volumes.get(guild_id)
+
+    async def set_dedicated_channel(self, guild_id: int, channel_id: int):
+        await self._wait()
+        self.dedicated_channels[guild_id] = channel_id
+        self.panel_messages.pop(guild_id, None)
+
+    async def get_dedicated_channel(self, guild_id: int) -> int | None:
+        await self._wait()
+        return self.dedicated_channels.get(guild_id)
+
+    async def get_dedicated_channels(self) -> dict[int, int]:
+        await self._wait()
+        return dict(self.dedicated_channels)
+
+    async def set_panel_message(self, guild_id: int, message_id: int):
+        await self._wait()
+        self.panel_messages[guild_id] = message_id
+
+    async def get_panel_message(self, guild_id: int) -> int | None:
+        await self._wait()
+        return self.panel_messages.get(guild_id)
+
+    async def get_played_after(self, guild_id: int) -> dict[str, list[tuple[str, int]]]:
+        await self._wait()
+        return dict(self.played_after.get(guild_id, {}))
+
+    async def save_played_after(self, guild_id: int, entries: dict[str, list[tuple[str, int]]]):
+        await self._wait()
+        self.played_after.setdefault(guild_id, {}).update(entries)
+
+    async def create_rollup_indexes(self):
+        pass
+
+    async def apply_guild_rollups(self, flush_id, rollups: list[tuple]) -> list[int]:
+        await self._wait()
+        for guild_id, period, start, plays, requesters in rollups:
+            document = self.guild_rollups.setdefault(
+                (guild_id, period, start),
+                {"guild_id": guild_id, "period": period, "start": start, "plays": 0, "requesters": {}, "flushes": []},
+            )
+            if flush_id in document["flushes"]:
+                continue
+            document["flushes"] = [*document["flushes"], flush_id][-10:]
+            document["plays"] += plays
+            for user_id, count in requesters.items():
+                document["requesters"][user_id] = document["requesters"].get(user_id, 0) + count
+        return []
+
+    async def apply_track_rollups(self, flush_id, rollups: list[tuple]) -> list[int]:
+        await self._wait()
+        for guild_id, period, start, source_name, identifier, title, plays in rollups:
+            document = self.track_rollups.setdefault(
+                (guild_id, period, start, source_name, identifier),
+                {"_id": {"source_name": source_name, "identifier": identifier}, "title": title, "plays": 0},
+            )
+            flushes = document.setdefault("flushes", [])
+            if flush_id in flushes:
+                continue
+            document["flushes"] = [*flushes, flush_id][-10:]
+            document["plays"] += plays
+            document["title"] = title
+        return []
+
+    async def get_guild_rollups(self, guild_id: int, period: str, since: datetime) -> list[dict]:
+        await self._wait()
+        return [
+            document
+            for (rollup_guild_id, rollup_period, start), document in self.guild_rollups.items()
+            if rollup_guild_id == guild_id and rollup_period == period and start >= since
+        ]
+
+    async def get_top_tracks(self, guild_id: int, since: datetime, limit: int = 10) -> list[dict]:
+        await self._wait()
+        totals: dict[tuple[str, str], dict] = {}
+        for (rollup_guild_id, period, start, source_name, identifier), document in self.track_rollups.items():
+            if rollup_guild_id != guild_id or period != "day" or start < since:
+                continue
+            total = totals.setdefault((source_name, identifier), {**document, "plays": 0})
+            total["plays"] += document["plays"]
+        return sorted(totals.values(), key=lambda document: document["plays"], reverse=True)[:limit]
+
+    async def save_tracks(self, documents: list[dict]):
+        await self._wait()
+        tracks = self.history["tracks"]
+        for document in documents:
+            stored = tracks.setdefault(document["_id"], dict(document))
+            for name, value in document.items():
+                if stored.get(name) is None or (name == "track" and value is not None):
+                    stored[name] = value
+
+    async def insert_history(self, collection: str, documents: list[dict]):
+        await self._wait()
+        for document in documents:
+            self.history[collection].setdefault(document["_id"], document)
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeTextChannel, content: str | None = None, view=None):
+        self.id = snowflake()
+        self.channel = channel
+        self.content = content
+        self.components = [] if view is None else [view]
+        self.created_at = discord.utils.utcnow()
+
+    async def edit(self, *, content=discord.utils.MISSING, view=discord.utils.MISSING, **kwargs):
+        if content is not discord.utils.MISSING:
+            self.content = content
+        if view is not discord.utils.MISSING:
+            self.components = [] if view is None else [view]
+        return self
+
+    async def delete(self):
+        self.channel.messages.pop(self.id, None)
+
+
+class FakeTextChannel:
+    def __init__(self, guild: FakeGuild):
+        self.id = snowflake()
+        self.guild = guild
+        self.messages: dict[int, FakeMessage] = {}
+        self.mention = f"<#{self.id}>"
+
+    def create_message(self, content: str | None = None, view=None) -> FakeMessage:
+        message = FakeMessage(self, content, view)
+        self.messages[message.id] = message
+        return message
+
+    async def send(self, content: str | None = None, *, view=None, **kwargs) -> FakeMessage:
+        return self.create_message(content, view)
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        message = self.messages.get(message_id)
+        if message is None:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        return message
+
+    async def delete_messages(self, messages: list[FakeMessage]):
+        for message in messages:
+            self.messages.pop(message.id, None)
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        message = self.messages.get(message_id)
+        if message is None:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        return message
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild: FakeGuild, *, user_limit: int = 0):
+        self.id = snowflake()
+        self.guild = guild
+        self.user_limit = user_limit
+        self.members: list[FakeMember] = []
+        self.status: str | None = None
+
+    def permissions_for(self, member: FakeMember) -> discord.Permissions:
+        return discord.Permissions(connect=True, speak=True)
+
+    def _get_voice_client_key(self):
+        return self.guild.id, "guild_id"
+
+    async def edit(self, *, status: str | None = None, **kwargs):
+        self.status = status
+
+    async def connect(self, *, cls, timeout: float = 60.0, reconnect: bool = True, self_deaf: bool = False):
+        voice_client = cls(self.guild.client, self)
+        self.guild.voice_client = voice_client
+        await voice_client.connect(timeout=timeout, reconnect=reconnect, self_deaf=self_deaf)
+        return voice_client
+
+
+class FakeMember:
+    def __init__(self, guild: FakeGuild, *, user_id: int | None = None, bot: bool = False, administrator=False):
+        self.id = user_id or snowflake()
+        self.guild = guild
+        self.bot = bot
+        self.voice: SimpleNamespace | None = None
+        self.guild_permissions = discord.Permissions(administrator=administrator)
+
+    def move_to(self, channel: FakeVoiceChannel | None):
+        if self.voice is not None and self in self.voice.channel.members:
+            self.voice.channel.members.remove(self)
+        if channel is None:
+            self.voice = None
+            return
+        channel.members.append(self)
+        self.voice = SimpleNamespace(channel=channel)
+
+
+class FakeGuild:
+    def __init__(self, client: FakeBot, *, voice_latency: float = 0.0):
+        self.id = snowflake()
+        self.client = client
+        self.voice_latency = voice_latency
+        self.name = f"Guild {self.id}"
+        self.preferred_locale = discord.Locale.korean
+        self.me = FakeMember(self, user_id=client.user.id, bot=True)
+        self.voice_client = None
+        self.text_channel = FakeTextChannel(self)
+        self.voice_channel = FakeVoiceChannel(self)
+        client.register(self)
+
+    async def change_voice_state(self, *, channel: FakeVoiceChannel | None, self_mute=False, self_deaf=False):
+        # Mirrors the gateway: the request returns immediately and the updates arrive later
+        asyncio.get_running_loop().create_task(self._voice_handshake(channel))
+
+    async def _voice_handshake(self, channel: FakeVoiceChannel | None):
+        if self.voice_latency > 0:
+            await asyncio.sleep(self.voice_latency)
+
+        voice_client = self.voice_client
+        self.me.move_to(channel)
+        if voice_client is None:
+            return
+
+        state = {
+            "guild_id": str(self.id),
+            "user_id": str(self.client.user.id),
+            "channel_id": str(channel.id) if channel is not None else None,
+            "session_id": f"session-{self.id}",
+        }
+        await voice_client.on_voice_state_update(state)
+        if channel is None:
+            self.voice_client = None
+            return
+        await voice_client.on_voice_server_update(
+            {"guild_id": str(self.id), "token": "token", "endpoint": "benchmark.discord.media"}
+        )
+
+
+class FakeResponse:
+    def __init__(self, interaction: FakeInteraction):
+        self.interaction = interaction
+        self.type: InteractionResponseType | None = None
+
+    def is_done(self) -> bool:
+        return self.type is not None
+
+    async def defer(self, *, thinking: bool = False, ephemeral: bool = False):
+        self.type = InteractionResponseType.deferred_channel_message
+        message = self.interaction.channel.create_message()
+        return SimpleNamespace(id=self.interaction.id, message_id=message.id)
+
+    async def send_message(self, content=None, *, view=discord.utils.MISSING, **kwargs):
+        self.type = InteractionResponseType.channel_message
+        view = None if view is discord.utils.MISSING else view
+        self.interaction.replies.append(self.interaction.channel.create_message(content, view))
+
+    async def edit_message(self, *, content=discord.utils.MISSING, view=discord.utils.MISSING, **kwargs):
+        self.type = InteractionResponseType.message_update
+        self.interaction.replies.append(self.interaction.channel.create_message(content, view))
+
+    async def autocomplete(self, choices):
+        self.type = InteractionResponseType.autocomplete_result
+        self.interaction.choices = choices
+
+
+class FakeFollowup:
+    def __init__(self, interaction: FakeInteraction):
+        self.interaction = interaction
+
+    async def send(self, content=None, *, view=discord.utils.MISSING, **kwargs) -> FakeMessage:
+        view = None if view is discord.utils.MISSING else view
+        message = self.interaction.channel.create_message(content, view)
+        self.interaction.replies.append(message)
+        return message
+
+
+class FakeInteraction:
+    def __init__(self, client: FakeBot, guild: FakeGuild, user: FakeMember, *, locale=discord.Locale.korean):
+        self.type = discord.InteractionType.application_command
+        self.id = snowflake()
+        self.client = client
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = guild.text_channel
+        self.channel_id = guild.text_channel.id
+        self.user = user
+        self.locale = locale
+        self.created_at = discord.utils.utcnow()
+        self.command = None
+        self.extras: dict = {}
+        self.replies: list[FakeMessage] = []
+        self.choices: list | None = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def translate(self, string, *, locale=discord.utils.MISSING, data=discord.utils.MISSING):
+        return await self.client.tree.translator.translate(string, self.locale, None)
+
+
+class FakeBot:
+    def __init__(self, database: InMemoryDatabase, translator=None):
+        self.user = SimpleNamespace(id=snowflake(), public_flags=SimpleNamespace(verified_bot=False))
+        self.database = database
+        self.application_emojis: dict[str, str] = {}
+        self.tree = SimpleNamespace(translator=translator)
+        self.guilds: list[FakeGuild] = []
+        self._connection = SimpleNamespace(_remove_voice_client=lambda key: None)
+        self._guilds: dict[int, FakeGuild] = {}
+        self._channels: dict[int, FakeTextChannel | FakeVoiceChannel] = {}
+
+    def register(self, guild: FakeGuild):
+        self.guilds.append(guild)
+        self._guilds[guild.id] = guild
+
+    def register_channel(self, channel: FakeTextChannel | FakeVoiceChannel):
+        self._channels[channel.id] = channel
+
+    def get_guild(self, guild_id: int) -> FakeGuild | None:
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        return self._channels.get(channel_id)
+
+    async def is_owner(self, user) -> bool:
+        return False
+
+    def create_guild(self, *, members: int = 1, voice_latency: float = 0.0) -> FakeGuild:
+        guild = FakeGuild(self, voice_latency=voice_latency)
+        self.register_channel(guild.text_channel)
+        self.register_channel(guild.voice_channel)
+        guild.members = [FakeMember(guild) for _ in range(members)]
+        for member in guild.members:
+            member.move_to(guild.voice_channel)
+        return guild
+
+    def create_interaction(self, guild: FakeGuild, *, user: FakeMember | None = None, **kwargs) -> FakeInteraction:
+        return FakeInteraction(self, guild, user or random.choice(guild.members), **kwargs)
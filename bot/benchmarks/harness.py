@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+
+import lavalink  # noqa: E402
+
+from benchmarks.fakes import (  # noqa: E402
+    FakeBot,
+    FakeLavalinkServer,
+    InMemoryDatabase,
+)
+from cogs.music import Music  # noqa: E402
+from translator import Translator  # noqa: E402
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(samples: list[float], quantile: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(quantile * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        "p90_ms": round(percentile(samples, 0.9) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def environment() -> dict[str, str | None]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        revision = None
+    return {"revision": revision, "python": platform.python_version(), "platform": platform.platform()}
+
+
+class Harness:
+    def __init__(self, *, server: FakeLavalinkServer, database: InMemoryDatabase):
+        self.server = server
+        self.database = database
+        self.bot: FakeBot | None = None
+        self.music: Music | None = None
+
+    async def start(self):
+        await self.server.start()
+
+        self.bot = FakeBot(self.database)
+        translator = Translator(self.bot, locale_dir=str(BOT_DIR / "locales"))
+        await translator.load()
+        self.bot.tree.translator = translator
+
+        client = lavalink.Client(self.bot.user.id)
+        node = client.add_node("127.0.0.1", self.server.port, self.server.password, "us", "benchmark-node")
+        self.bot.lavalink = client
+
+        while not client.node_manager.available_nodes or node._transport.session_id is None:
+            await asyncio.sleep(0.01)
+
+        self.music = Music(self.bot)
+        await self.music.cog_load()
+
+    async def close(self):
+        if self.music is not None:
+            await self.music.cog_unload()
+        await self.server.close()
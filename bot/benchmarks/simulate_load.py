@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import resource
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fakes import FakeLavalinkServer, InMemoryDatabase  # noqa: E402
+from benchmarks.harness import Harness, environment, summarize  # noqa: E402
+from cogs.music import Music  # noqa: E402
+
+DEFAULT_QUERIES = ["benchmark query", "https://example.com/track", "https://example.com/playlist"]
+OPERATIONS = {"play": 0.6, "skip": 0.15, "stop": 0.05, "voice": 0.2}
+
+
+class TimedLock(asyncio.Lock):
+    def __init__(self, waits: list[float]):
+        super().__init__()
+        self.waits = waits
+
+    async def acquire(self):
+        if not self.locked():
+            return await super().acquire()
+        start = time.perf_counter()
+        result = await super().acquire()
+        self.waits.append(time.perf_counter() - start)
+        return result
+
+
+class Workload:
+    def __init__(self, queries: list[str], gaps: list[float]):
+        self.queries = queries
+        self.gaps = gaps
+
+    @classmethod
+    def synthetic(cls, rate: float) -> "Workload":
+        return cls(DEFAULT_QUERIES, [random.expovariate(rate) for _ in range(10000)])
+
+    @classmethod
+    def from_export(cls, path: Path, speed: float) -> "Workload":
+        # Accepts JSON lines exported from play_command_history or query_history (mongoexport or export_history)
+        records = []
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                document = json.loads(line)
+                created_at = document.get("created_at")
+                if isinstance(created_at, dict):
+                    created_at = created_at.get("$date")
+                if isinstance(created_at, (int, float)):
+                    timestamp = created_at / 1000
+                else:
+                    timestamp = datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).timestamp()
+                records.append((timestamp, document["query"]))
+
+        if not records:
+            raise ValueError(f"No records found in {path}")
+
+        records.sort()
+        gaps = [max(b[0] - a[0], 0.0) / speed for a, b in zip(records, records[1:])] or [0.0]
+        return cls([query for _, query in records], gaps)
+
+
+def resident_memory() -> int:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Simulation:
+    def __init__(self, harness: Harness, workload: Workload, guilds: int, members: int):
+        self.harness = harness
+        self.music = harness.music
+        self.workload = workload
+        self.guilds = [harness.bot.create_guild(members=members) for _ in range(guilds)]
+        for guild in self.guilds:
+            for member in guild.members:
+                # Lets anyone skip a track requested by someone else
+                member.guild_permissions.administrator = True
+        self.latencies: defaultdict[str, list[float]] = defaultdict(list)
+        self.errors: defaultdict[str, Counter] = defaultdict(Counter)
+        self.lock_waits: list[float] = []
+        self.music._locks = {}
+        self.music.get_lock = self.get_lock
+
+    def get_lock(self, guild_id: int) -> asyncio.Lock:
+        if guild_id not in self.music._locks:
+            self.music._locks[guild_id] = TimedLock(self.lock_waits)
+        return self.music._locks[guild_id]
+
+    def create_interaction(self, guild):
+        # Commands are issued by someone in the voice channel, otherwise the checks reject them
+        listeners = [member for member in guild.members if member.voice is not None]
+        if not listeners:
+            member = random.choice(guild.members)
+            member.move_to(guild.voice_channel)
+            listeners.append(member)
+        return self.harness.bot.create_interaction(guild, user=random.choice(listeners))
+
+    async def play(self, guild, query: str):
+        interaction = self.create_interaction(guild)
+        await Music.play.callback(self.music, interaction, query)
+
+    async def skip(self, guild, query: str):
+        if self.music.get_player(guild.id) is None or guild.voice_client is None:
+            return await self.play(guild, query)
+        interaction = self.create_interaction(guild)
+        await Music.skip.callback(self.music, interaction)
+
+    async def stop(self, guild, query: str):
+        if self.music.get_player(guild.id) is None or guild.voice_client is None:
+            return await self.play(guild, query)
+        interaction = self.create_interaction(guild)
+        await Music.stop.callback(self.music, interaction)
+
+    async def voice(self, guild, query: str):
+        member = random.choice(guild.members)
+        channel = guild.voice_channel
+        if member.voice is not None:
+            member.move_to(None)
+            before, after = SimpleNamespace(channel=channel), SimpleNamespace(channel=None)
+        else:
+            member.move_to(channel)
+            before, after = SimpleNamespace(channel=None), SimpleNamespace(channel=channel)
+        await self.music.on_voice_state_update(member, before, after)
+
+    async def execute(self, operation: str, guild, query: str):
+        start = time.perf_counter()
+        try:
+            await getattr(self, operation)(guild, query)
+        except Exception as e:
+            self.errors[operation][type(e).__name__] += 1
+        finally:
+            self.latencies[operation].append(time.perf_counter() - start)
+
+    async def run(self, duration: float) -> dict:
+        names, weights = zip(*OPERATIONS.items())
+        tasks = []
+        index = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            operation = random.choices(names, weights)[0]
+            query = self.workload.queries[index % len(self.workload.queries)]
+            gap = self.workload.gaps[index % len(self.workload.gaps)]
+            index += 1
+            tasks.append(asyncio.create_task(self.execute(operation, random.choice(self.guilds), query)))
+            await asyncio.sleep(gap)
+
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+        contended = len(self.lock_waits)
+        return {
+            "guilds": len(self.guilds),
+            "operations": len(tasks),
+            "throughput_per_s": round(len(tasks) / elapsed, 1),
+            "latency": {operation: summarize(samples) for operation, samples in self.latencies.items()},
+            "errors": {operation: dict(errors) for operation, errors in self.errors.items()},
+            "lock_contention": {"contended_acquires": contended, "wait": summarize(self.lock_waits)},
+            "players": len(self.harness.bot.lavalink.player_manager.players),
+            "resident_memory_bytes": resident_memory(),
+        }
+
+
+async def run(args) -> dict:
+    if args.replay:
+        workload = Workload.from_export(Path(args.replay), args.speed)
+    else:
+        workload = Workload.synthetic(args.rate)
+
+    steps = []
+    for guilds in args.guilds:
+        server = FakeLavalinkServer(load_latency=args.load_latency, playlist_size=args.playlist_size)
+        harness = Harness(server=server, database=InMemoryDatabase(latency=args.database_latency))
+        await harness.start()
+        try:
+            simulation = Simulation(harness, workload, guilds, args.members)
+            steps.append(await simulation.run(args.duration))
+        finally:
+            await harness.close()
+
+    return {"environment": environment(), "config": vars(args), "steps": steps}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument(
+        "--guilds", type=int, nargs="+", default=[100, 1000, 5000], help="Guild counts to simulate, one step each"
+    )
+    parser.add_argument("--members", type=int, default=3, help="Members in each guild's voice channel")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load for per step")
+    parser.add_argument("--rate", type=float, default=200.0, help="Synthetic arrival rate in operations per second")
+    parser.add_argument("--replay", help="JSON lines export of play_command_history or query_history to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--load-latency", type=float, default=0.05, help="Fake Lavalink loadtracks latency")
+    parser.add_argument("--database-latency", type=float, default=0.001, help="Latency of the in-memory database")
+    parser.add_argument("--playlist-size", type=int, default=100, help="Tracks returned for playlist queries")
+
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=4)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
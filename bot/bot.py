@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 import logging
+import time
 from pathlib import Path
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+import metrics
+import runtime
+import tracing
 from database import Database
-from logger import Formatter, get_formatter
+from emojis import EmojiRegistry
+from logger import setup_logging
+from loop_monitor import LoopMonitor
+from metrics import MetricsServer, RateLimitFilter
 from settings import settings
 from translator import Translator
 
@@ -15,24 +22,42 @@ from translator import Translator
 EXTENSIONS = [
     "cogs.music",
     "cogs.misc",
-    "cogs.settings"
+    "cogs.settings",
+    "cogs.stats"
 ]
 # fmt: on
 
 logger = logging.getLogger("bot")
 logger.setLevel(logging.DEBUG)
 
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.INFO)
-stream_handler.setFormatter(get_formatter())
-logger.addHandler(stream_handler)
+log_handler = setup_logging(
+    logger,
+    Path("logs/bot.log"),
+    queue_size=settings.LOG_QUEUE_SIZE,
+    max_bytes=settings.LOG_MAX_BYTES,
+    backup_count=settings.LOG_BACKUP_COUNT,
+    interval=settings.LOG_ROTATE_INTERVAL,
+    json_format=settings.LOG_FORMAT == "json",
+)
 
-log_path = Path("logs/bot.log")
-log_path.parent.mkdir(parents=True, exist_ok=True)
-file_handler = logging.FileHandler(log_path, encoding="utf-8")
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(Formatter())
-logger.addHandler(file_handler)
+logging.getLogger("discord.http").addFilter(RateLimitFilter())
+
+
+class CommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["started_at"] = time.perf_counter()
+        if interaction.type is discord.InteractionType.application_command and interaction.command is not None:
+            interaction.extras["trace"] = tracing.tracer.start_trace(
+                interaction.id, interaction.command.qualified_name, guild_id=interaction.guild_id
+            )
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        trace = tracing.get_trace(interaction)
+        if trace is not None:
+            trace.attributes["error"] = type(error).__name__
+            tracing.tracer.finish(trace)
+        await super().on_error(interaction, error)
 
 
 class Bot(commands.Bot):
@@ -46,6 +71,7 @@ class Bot(commands.Bot):
             allowed_contexts=app_commands.AppCommandContext(guild=True, dm_channel=False, private_channel=False),
             allowed_installs=app_commands.AppInstallationType(guild=True, user=False),
             intents=intents,
+            tree_cls=CommandTree,
         )
 
         self.database = Database(
@@ -56,11 +82,34 @@ class Bot(commands.Bot):
             name=settings.DATABASE_NAME,
         )
 
-        self.application_emojis: dict[str, str] = {}
+        self.emoji_registry = EmojiRegistry(self)
+        self.loop_monitor = LoopMonitor(
+            interval=settings.LOOP_MONITOR_INTERVAL,
+            threshold=settings.LOOP_LAG_THRESHOLD,
+            cooldown=settings.LOOP_LAG_REPORT_COOLDOWN,
+        )
+        self.metrics_server = MetricsServer(metrics.registry, host=settings.METRICS_HOST, port=settings.METRICS_PORT)
+
+    @property
+    def application_emojis(self) -> dict[str, str]:
+        return self.emoji_registry.emojis
 
     async def setup_hook(self):
-        await self.fetch_emojis()
-        await self.tree.set_translator(Translator(self))
+        tracing.tracer.configure(settings.TRACE_PATH, sample_rate=settings.TRACE_SAMPLE_RATE)
+        if settings.LOOP_MONITOR_INTERVAL > 0:
+            self.loop_monitor.start()
+        self.emoji_registry.load()
+        translator = Translator(self, cache_size=settings.TRANSLATION_CACHE_SIZE)
+        self.emoji_registry.add_listener(translator.set_emojis)
+        await self.tree.set_translator(translator)
+        translator.start_watching(settings.LOCALE_RELOAD_INTERVAL)
+        self.emoji_registry.start()
+        if settings.METRICS_PORT:
+            metrics.registry.add_collector(self.collect_metrics)
+            try:
+                await self.metrics_server.start()
+            except Exception:
+                logger.exception("[Metrics] Failed to start metrics server")
         for extension in EXTENSIONS:
             try:
                 await self.load_extension(extension)
@@ -69,20 +118,48 @@ class Bot(commands.Bot):
                 logger.exception(f"[Cog] Failed to load: {extension}")
         await self.tree.sync()
 
+    async def on_ready(self):
+        # Guilds, channels and members are cached by now and live as long as the bot
+        runtime.freeze()
+
     async def on_message(self, message: discord.Message):
         pass
 
+    async def on_app_command_completion(
+        self, interaction: discord.Interaction, command: app_commands.Command | app_commands.ContextMenu
+    ):
+        started_at = interaction.extras.get("started_at")
+        if started_at is not None:
+            metrics.command_duration.labels(command.qualified_name).observe(time.perf_counter() - started_at)
+        tracing.tracer.finish(tracing.get_trace(interaction))
+
+    def collect_metrics(self):
+        translator = self.tree.translator
+        if isinstance(translator, Translator):
+            for stat, value in translator.cache.stats().items():
+                metrics.translation_cache.labels(stat).set(value)
+        for level, count in log_handler.dropped.items():
+            metrics.dropped_log_records.labels(level).set(count)
+
     async def close(self):
-        await self.database.close()
+        start = time.perf_counter()
+        # Unloading the cogs drains the players and flushes their history, so everything they use closes afterwards
         await super().close()
-
-    async def fetch_emojis(self):
-        emojis = await self.fetch_application_emojis()
-        self.application_emojis = {emoji.name: f"<:{emoji.name}:{emoji.id}>" for emoji in emojis}
+        await self.loop_monitor.stop()
+        await self.metrics_server.close()
+        await tracing.tracer.close()
+        await self.emoji_registry.close()
+        await self.tree.set_translator(None)
+        await self.database.close()
+        logger.info(f"[Shutdown] Closed in {time.perf_counter() - start:.2f}s")
 
 
 bot = Bot()
 
 
 if __name__ == "__main__":
-    bot.run(settings.BOT_TOKEN)
+    logger.info(f"[Runtime] {runtime.configure(settings.RUNTIME_PROFILE, gc_thresholds=settings.GC_THRESHOLDS)}")
+    try:
+        bot.run(settings.BOT_TOKEN)
+    finally:
+        log_handler.stop()
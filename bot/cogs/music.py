@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from collections import deque
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 
@@ -10,49 +12,105 @@ import lavalink
 from discord import app_commands
 from discord.app_commands import locale_str as _T
 from discord.ext import commands
-from discord.ui import Button, View
+from discord.ui import Button, Select, View
+from discord.utils import MISSING
 from lavalink.errors import ClientError
 from lavalink.events import (
     NodeConnectedEvent,
     NodeDisconnectedEvent,
     QueueEndEvent,
+    TrackEndEvent,
+    TrackExceptionEvent,
+    TrackLoadFailedEvent,
     TrackStartEvent,
+    TrackStuckEvent,
 )
 from lavalink.filters import Volume
 from lavalink.server import LoadType
 
+import metrics
+import tracing
 import utils
-from models import PlaybackHistory, PlayCommandHistory
+from admission import AdmissionController
+from autoplay import PlayedAfterIndex
+from history import HistorySpool, HistoryWriter
+from models import PlaybackHistory, PlayCommandHistory, QueryHistory
+from player import LazyTrack, Player
+from rollups import RollupWriter
+from search import Debouncer, SearchCache, normalize_query
 from settings import settings
 
 if TYPE_CHECKING:
     from bot import Bot
 
 DEFAULT_VOLUME = 100
+QUEUE_PAGE_SIZE = 10
+SEARCH_RESULTS = 10
+REQUEST_BATCH_WINDOW = 0.5
+PANEL_UPDATE_DELAY = 1.0
+PANEL_QUEUE_PREVIEW = 5
+PANEL_NOTICES = 5
 
 logger = logging.getLogger("bot.music")
 
 
-def has_available_nodes():
+def has_available_nodes(*, healthy: bool = False):
     async def predicate(interaction: discord.Interaction) -> bool:
         binding = interaction.command.binding
         if len(binding.lavalink.node_manager.available_nodes) == 0:
             await utils.send_message(interaction, "message.nodes.unavailable", ephemeral=True)
             return False
+        # Guilds that are already playing keep their player, so only new players are turned away
+        if healthy and binding.get_player(interaction.guild_id) is None and not binding.admission.admit_player():
+            await utils.send_message(interaction, "message.nodes.busy", ephemeral=True)
+            return False
         return True
 
     return app_commands.check(predicate)
 
 
+def voice_state_error(member: discord.Member) -> str | None:
+    user_voice = member.voice
+    if user_voice is None:
+        return "message.channel.join_first"
+    voice = member.guild.me.voice
+    if voice is not None and voice.channel.id != user_voice.channel.id:
+        return "message.channel.join_my_channel"
+    return None
+
+
+def can_join(member: discord.Member) -> bool:
+    return member.voice.channel.permissions_for(member.guild.me).connect
+
+
+def is_full(member: discord.Member) -> bool:
+    if member.guild.me.voice is not None:
+        return False
+    channel = member.voice.channel
+    return 0 < channel.user_limit <= len(channel.members)
+
+
+def can_speak(member: discord.Member) -> bool:
+    return member.voice.channel.permissions_for(member.guild.me).speak
+
+
+def voice_request_error(member: discord.Member) -> str | None:
+    # The voice checks of /play, for requests that do not go through the command checks
+    key = voice_state_error(member)
+    if key is not None:
+        return key
+    if not can_join(member):
+        return "message.channel.missing_permissions"
+    if is_full(member):
+        return "message.channel.full"
+    return None
+
+
 def ensure_voice_state():
     async def predicate(interaction: discord.Interaction) -> bool:
-        user_voice = interaction.user.voice
-        if user_voice is None:
-            await utils.send_message(interaction, "message.channel.join_first", ephemeral=True)
-            return False
-        voice = interaction.guild.me.voice
-        if voice is not None and voice.channel.id != user_voice.channel.id:
-            await utils.send_message(interaction, "message.channel.join_my_channel", ephemeral=True)
+        key = voice_state_error(interaction.user)
+        if key is not None:
+            await utils.send_message(interaction, key, ephemeral=True)
             return False
         return True
 
@@ -73,9 +131,7 @@ def is_playing():
 
 def can_join_voice_channel():
     async def predicate(interaction: discord.Interaction) -> bool:
-        voice_channel = interaction.user.voice.channel
-        permissions = voice_channel.permissions_for(interaction.guild.me)
-        if not permissions.connect:
+        if not can_join(interaction.user):
             await utils.send_message(interaction, "message.channel.missing_permissions", ephemeral=True)
             return False
         return True
@@ -85,11 +141,7 @@ def can_join_voice_channel():
 
 def is_channel_not_full():
     async def predicate(interaction: discord.Interaction) -> bool:
-        voice = interaction.guild.me.voice
-        if voice is not None:
-            return True
-        channel = interaction.user.voice.channel
-        if 0 < channel.user_limit <= len(channel.members):
+        if is_full(interaction.user):
             await utils.send_message(interaction, "message.channel.full", ephemeral=True)
             return False
         return True
@@ -97,15 +149,18 @@ def is_channel_not_full():
     return app_commands.check(predicate)
 
 
-async def dynamic_cooldown(interaction: discord.Interaction) -> app_commands.Cooldown | None:
-    binding = interaction.command.binding
-    if await binding.bot.is_owner(interaction.user):
+async def request_cooldown(bot: Bot, member: discord.Member) -> app_commands.Cooldown | None:
+    if await bot.is_owner(member):
         return None
-    if interaction.user.guild_permissions.administrator:
+    if member.guild_permissions.administrator:
         return app_commands.Cooldown(10, 300)
     return app_commands.Cooldown(10, 600)
 
 
+async def dynamic_cooldown(interaction: discord.Interaction) -> app_commands.Cooldown | None:
+    return await request_cooldown(interaction.command.binding.bot, interaction.user)
+
+
 async def search_cooldown(interaction: discord.Interaction) -> app_commands.Cooldown | None:
     binding = interaction.command.binding
     if await binding.bot.is_owner(interaction.user):
@@ -163,7 +218,13 @@ class QueuedItemView(View):
                     await utils.send_message(interaction, "message.queue.cancel_unavailable", ephemeral=True)
                     return
 
-            player.queue = [track for track in player.queue if track.extra.get("message_id") != message_id]
+            queue = []
+            for track in player.queue:
+                if track.extra.get("message_id") == message_id:
+                    tracing.finish_track(track, "canceled")
+                else:
+                    queue.append(track)
+            player.queue = queue
 
             try:
                 await interaction.message.delete()
@@ -175,6 +236,351 @@ class QueuedItemView(View):
             self.done = True
 
 
+class QueueView(View):
+    def __init__(self, music: Music, interaction: discord.Interaction, page: int, pages: int, *, timeout=180):
+        super().__init__(timeout=timeout)
+        self.music = music
+        self.interaction = interaction
+        self.page = page
+
+        self.first_page = self.add_button("first_page", "⏮", lambda: 0)
+        self.previous_page = self.add_button("keyboard_arrow_left", "◀", lambda: self.page - 1)
+        self.next_page = self.add_button("keyboard_arrow_right", "▶", lambda: self.page + 1)
+        self.last_page = self.add_button("last_page", "⏭", lambda: -1)
+        self.update(pages)
+
+    def add_button(self, name: str, fallback: str, target) -> Button:
+        button = Button(emoji=self.music.bot.application_emojis.get(name) or fallback)
+
+        async def callback(interaction: discord.Interaction):
+            await self.show(interaction, target())
+
+        button.callback = callback
+        self.add_item(button)
+        return button
+
+    def update(self, pages: int):
+        self.first_page.disabled = self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.last_page.disabled = self.page >= pages - 1
+
+    async def on_timeout(self):
+        try:
+            await self.interaction.edit_original_response(view=None)
+        except:
+            pass
+
+    async def show(self, interaction: discord.Interaction, page: int):
+        player = self.music.get_player(interaction.guild_id)
+        if player is None:
+            content = await utils.translate(interaction, "message.player.not_playing")
+            await interaction.response.edit_message(content=content, view=None)
+            self.stop()
+            return
+
+        content, self.page, pages = await self.music.render_queue_page(interaction, player, page)
+        self.update(pages)
+        await interaction.response.edit_message(
+            content=content, view=self, allowed_mentions=discord.AllowedMentions.none()
+        )
+
+
+class SearchResultView(View):
+    message: discord.Message
+
+    def __init__(
+        self, music: Music, requester_id: int, tracks: list[lavalink.AudioTrack], placeholder: str, *, timeout=60
+    ):
+        super().__init__(timeout=timeout)
+        self.music = music
+        self.requester_id = requester_id
+        self.tracks = tracks
+
+        self.select = Select(
+            placeholder=placeholder,
+            options=[
+                discord.SelectOption(
+                    label=track.title[:100],
+                    description=f"{track.author} · {utils.format_duration(track.duration)}"[:100],
+                    value=str(index),
+                )
+                for index, track in enumerate(tracks)
+            ],
+        )
+        self.select.callback = self.select_track
+        self.add_item(self.select)
+
+    async def on_timeout(self):
+        if not self.message.components:
+            return
+
+        try:
+            await self.message.edit(view=None)
+        except:
+            pass
+
+    async def select_track(self, interaction: discord.Interaction):
+        if interaction.user.id != self.requester_id:
+            await utils.send_message(interaction, "message.search.unauthorized", ephemeral=True)
+            return
+
+        # The command checks do not run for components, so the ones /play runs are repeated here
+        key = voice_request_error(interaction.user)
+        if key is not None:
+            await utils.send_message(interaction, key, ephemeral=True)
+            return
+        if not can_speak(interaction.user):
+            permission = await interaction.translate(_T("speak", key="permission.speak"), locale=interaction.locale)
+            await utils.send_message(
+                interaction, "message.missing_permissions", ephemeral=True, permissions=f"`{permission}`"
+            )
+            return
+        if self.music.get_player(interaction.guild_id) is None and not self.music.admission.admit_player():
+            await utils.send_message(interaction, "message.nodes.busy", ephemeral=True)
+            return
+        retry_after = await self.music.request_retry_after(interaction.user, interaction.created_at.timestamp())
+        if retry_after is not None:
+            remaining_time = str(timedelta(seconds=int(retry_after))).removeprefix("0:")
+            await utils.send_message(interaction, "message.cooldown", ephemeral=True, remaining_time=remaining_time)
+            return
+
+        self.stop()
+        track = self.tracks[int(self.select.values[0])]
+        response = await interaction.response.defer(thinking=True)
+        try:
+            await self.message.edit(view=None)
+        except Exception:
+            pass
+        await self.music.enqueue(interaction, response, track.uri, track=track)
+
+
+class RequestLane:
+    def __init__(self, music: Music, guild: discord.Guild, channel: discord.TextChannel):
+        self.music = music
+        self.guild = guild
+        self.channel = channel
+        self.locale = guild.preferred_locale
+        self.pending: list[discord.Message] = []
+        self.notices: deque[str] = deque(maxlen=PANEL_NOTICES)
+        self.panel_message_id: int | None = None
+        self._panel_loaded = False
+        self._batch_task: asyncio.Task | None = None
+        self._panel_task: asyncio.Task | None = None
+
+    def render(self, key: str, **kwargs) -> str:
+        translator = self.music.bot.tree.translator
+        # Lines carrying titles or counts are nearly unique, caching them would only evict the fixed messages
+        if kwargs:
+            return translator.render(key, self.locale, kwargs)
+        return translator.render_cached(key, self.locale, kwargs)
+
+    def notify(self, key: str, **kwargs):
+        self.notices.append(self.render(key, **kwargs))
+        self.schedule_panel_update()
+
+    def check_member(self, member: discord.Member) -> bool:
+        # The same checks /play runs, repeated before connecting since the member may have moved in the meantime
+        key = voice_request_error(member)
+        if key is not None:
+            self.notify(key)
+            return False
+        if not can_speak(member):
+            self.notify("message.missing_permissions", permissions=f"`{self.render('permission.speak')}`")
+            return False
+        return True
+
+    def submit(self, message: discord.Message):
+        self.pending.append(message)
+        # Requests arriving within the window are resolved together
+        if self._batch_task is None:
+            self._batch_task = asyncio.create_task(self.process_later())
+
+    async def process_later(self):
+        await asyncio.sleep(REQUEST_BATCH_WINDOW)
+        messages, self.pending = self.pending, []
+        self._batch_task = None
+        try:
+            await self.process(messages)
+        except Exception:
+            logger.exception("[RequestLane] Failed to process requests")
+        finally:
+            await self.delete_messages(messages)
+
+    async def process(self, messages: list[discord.Message]):
+        music = self.music
+        async with music.get_lock(self.guild.id):
+            if music.get_player(self.guild.id) is None and not music.admission.admit_player():
+                self.notify("message.nodes.busy")
+                return
+
+            player = await music.create_player(self.guild.id, node=music.admission.select_node())
+            queries = [message.content.strip().strip("<>") for message in messages]
+            results = await asyncio.gather(
+                *(player.node.get_tracks(query if utils.is_url(query) else f"ytsearch:{query}") for query in queries),
+                return_exceptions=True,
+            )
+
+            requests = []
+            for message, query, result in zip(messages, queries, results):
+                if isinstance(result, Exception) or result.load_type == LoadType.ERROR:
+                    self.notify("message.play.load_failed")
+                    continue
+                if result.load_type == LoadType.EMPTY:
+                    self.notify("message.play.not_found", query=query)
+                    continue
+                if result.load_type == LoadType.PLAYLIST:
+                    if not music.admission.admit_playlist(player.node, len(result.tracks)):
+                        self.notify("message.nodes.busy_playlist")
+                        continue
+                    tracks = result.tracks
+                else:
+                    tracks = [result.tracks[0]]
+                requests.append((message, query, result, tracks))
+
+            voice = self.guild.me.voice
+            voice_channel = voice.channel if voice is not None else None
+            accepted = []
+            for request in requests:
+                member = request[0].author
+                if not self.check_member(member):
+                    continue
+                # Until the bot joins, the first request decides the channel and the rest have to be in it
+                if voice_channel is None:
+                    voice_channel = member.voice.channel
+                elif member.voice.channel.id != voice_channel.id:
+                    self.notify("message.channel.join_my_channel")
+                    continue
+                accepted.append(request)
+            requests = accepted
+
+            if not requests:
+                if not player.is_playing and not player.queue:
+                    await player.destroy()
+                return
+
+            if voice is None:
+                await voice_channel.connect(cls=VoiceClient, self_deaf=True)
+                player.store("channel", voice_channel.id)
+
+            for message, query, result, tracks in requests:
+                if result.load_type == LoadType.PLAYLIST:
+                    self.notify("message.queue.playlist_added", name=result.playlist_info.name)
+                else:
+                    self.notify("message.queue.track_added", name=tracks[0].title)
+
+            for message, query, result, tracks in requests:
+                music.add_tracks(
+                    player,
+                    tracks,
+                    message.author.id,
+                    query=query,
+                    interaction_id=message.id,
+                    message_id=message.id,
+                    channel_id=self.channel.id,
+                    locale=self.locale,
+                    dedicated_channel=True,
+                )
+
+            if not player.is_playing:
+                volume = await music.get_volume(voice_channel)
+                if volume == 100:
+                    await player.play()
+                else:
+                    await player.play(volume=volume)
+
+            for message, query, result, tracks in requests:
+                music.history.write(
+                    PlayCommandHistory.from_dict(
+                        {
+                            "channel_id": self.channel.id,
+                            "interaction_id": message.id,
+                            "message_id": message.id,
+                            "user_id": message.author.id,
+                            "query": query,
+                            "load_type": "playlist" if result.load_type == LoadType.PLAYLIST else "track",
+                            "tracks": tracks,
+                        }
+                    ),
+                    tracks,
+                )
+
+    async def delete_messages(self, messages: list[discord.Message]):
+        try:
+            await self.channel.delete_messages(messages)
+        except Exception:
+            logger.debug("[RequestLane] Failed to delete request messages")
+
+    def schedule_panel_update(self):
+        # Bursts of changes collapse into a single edit of the panel
+        if self._panel_task is None:
+            self._panel_task = asyncio.create_task(self.update_panel_later())
+
+    async def update_panel_later(self):
+        await asyncio.sleep(PANEL_UPDATE_DELAY)
+        self._panel_task = None
+        try:
+            await self.update_panel()
+        except Exception:
+            logger.exception("[RequestLane] Failed to update the panel")
+
+    def render_panel(self) -> str:
+        lines = list(self.notices)
+        if lines:
+            lines.append("")
+
+        player = self.music.get_player(self.guild.id)
+        if player is None or player.current is None:
+            lines.append(self.render("message.panel.idle"))
+            return "\n".join(lines)
+
+        current = player.current
+        duration = self.render("message.queue.live") if current.stream else utils.format_duration(current.duration)
+        lines.append(self.render("message.queue.now_playing", title=current.title, duration=duration))
+        queue = player.queue
+        if not queue:
+            lines.append(self.render("message.queue.empty"))
+            return "\n".join(lines)
+
+        lines.append(
+            self.render("message.queue.summary", count=len(queue), duration=utils.format_duration(queue.duration))
+        )
+        for index, track in enumerate(queue[:PANEL_QUEUE_PREVIEW], 1):
+            duration = self.render("message.queue.live") if track.stream else utils.format_duration(track.duration)
+            lines.append(
+                self.render(
+                    "message.queue.item", index=index, title=track.title, duration=duration, requester=track.requester
+                )
+            )
+        if len(queue) > PANEL_QUEUE_PREVIEW:
+            lines.append(self.render("message.panel.more", count=len(queue) - PANEL_QUEUE_PREVIEW))
+        return "\n".join(lines)
+
+    async def update_panel(self):
+        content = self.render_panel()
+        allowed_mentions = discord.AllowedMentions.none()
+
+        if not self._panel_loaded:
+            self.panel_message_id = await self.music.database.get_panel_message(self.guild.id)
+            self._panel_loaded = True
+
+        if self.panel_message_id is not None:
+            try:
+                await self.channel.get_partial_message(self.panel_message_id).edit(
+                    content=content, allowed_mentions=allowed_mentions
+                )
+                return
+            except discord.NotFound:
+                pass
+
+        message = await self.channel.send(content, allowed_mentions=allowed_mentions, silent=True)
+        self.panel_message_id = message.id
+        await self.music.database.set_panel_message(self.guild.id, message.id)
+
+    def close(self):
+        for task in (self._batch_task, self._panel_task):
+            if task is not None:
+                task.cancel()
+
+
 class VoiceClient(discord.VoiceProtocol):
     def __init__(self, client: discord.Client, channel: discord.abc.Connectable):
         self.client = client
@@ -248,21 +654,54 @@ class Music(commands.Cog):
             )
         self.lavalink = self.bot.lavalink
         self.lavalink.add_event_hooks(self)
+        self.admission = AdmissionController(
+            self.lavalink,
+            max_cpu_load=settings.ADMISSION_MAX_CPU_LOAD,
+            max_frame_deficit=settings.ADMISSION_MAX_FRAME_DEFICIT,
+            large_playlist=settings.ADMISSION_LARGE_PLAYLIST,
+            refresh_interval=settings.ADMISSION_STATS_INTERVAL,
+        )
         self._dedicated_channels: dict[int, int] = {}
+        self._lanes: dict[int, RequestLane] = {}
+        self.played_after = PlayedAfterIndex(
+            self.database, top_k=settings.AUTOPLAY_TOP_K, save_interval=settings.AUTOPLAY_SAVE_INTERVAL
+        )
+        self.history = HistoryWriter(
+            self.database,
+            HistorySpool(settings.HISTORY_SPOOL_PATH, fsync_interval=settings.HISTORY_SPOOL_FSYNC_INTERVAL),
+            timeout=settings.HISTORY_WRITE_TIMEOUT,
+            replay_interval=settings.HISTORY_REPLAY_INTERVAL,
+        )
+        self.rollups = RollupWriter(self.database, flush_interval=settings.ROLLUP_FLUSH_INTERVAL)
         self._disconnect_tasks: dict[int, asyncio.Task] = {}
         self._locks: dict[int, asyncio.Lock] = {}
+        self._request_cooldowns: dict[tuple[int, int], app_commands.Cooldown] = {}
+        self._searches: dict[str, asyncio.Task] = {}
+        self.draining = False
+        self.search_cache = SearchCache(settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL)
+        self.search_debouncer = Debouncer(settings.SEARCH_DEBOUNCE)
         self._loop = asyncio.get_event_loop()
 
     async def cog_load(self):
         self._dedicated_channels = await self.database.get_dedicated_channels()
+        metrics.registry.add_collector(self.collect_metrics)
+        self.admission.start()
+        self.played_after.start()
+        self.history.start()
+        await self.rollups.start()
 
     async def cog_unload(self):
-        lavalink = self.bot.lavalink
-        lavalink._event_hooks.clear()
+        await self.drain(concurrency=settings.SHUTDOWN_CONCURRENCY, timeout=settings.SHUTDOWN_TIMEOUT)
 
-        for guild_id, player in list(lavalink.players.items()):
-            await self.cleanup_player(guild_id, player)
+        metrics.registry.remove_collector(self.collect_metrics)
+        await self.admission.stop()
+        await self.played_after.stop()
+        await self.rollups.stop()
+        # Pending history writes finish or fall back to the spool, each bounded by the write timeout
+        await self.history.stop()
 
+        lavalink = self.bot.lavalink
+        lavalink._event_hooks.clear()
         try:
             await lavalink.close()
         except Exception:
@@ -270,6 +709,49 @@ class Music(commands.Cog):
         finally:
             del self.bot.lavalink
 
+    async def drain(self, *, concurrency: int, timeout: float) -> float:
+        # New requests are refused while every player is cleaned up concurrently, stragglers are dropped at the deadline
+        start = time.perf_counter()
+        self.draining = True
+
+        for lane in self._lanes.values():
+            lane.close()
+        self._lanes.clear()
+        disconnect_tasks = list(self._disconnect_tasks.values())
+        self._disconnect_tasks.clear()
+        for task in disconnect_tasks:
+            task.cancel()
+        await asyncio.gather(*disconnect_tasks, return_exceptions=True)
+
+        players = list(self.bot.lavalink.players.items())
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def cleanup(guild_id: int, player: lavalink.DefaultPlayer):
+            async with semaphore:
+                await self.cleanup_player(guild_id, player)
+
+        tasks = [asyncio.create_task(cleanup(guild_id, player)) for guild_id, player in players]
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"[Shutdown] Drained {len(players) - len(pending)}/{len(players)} players in {elapsed:.2f}s"
+            + (f", {len(pending)} timed out" if pending else "")
+        )
+        return elapsed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not self.draining:
+            return True
+        if interaction.type == discord.InteractionType.application_command:
+            await utils.send_message(interaction, "message.shutdown.draining", ephemeral=True)
+        return False
+
     async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         if isinstance(error, app_commands.CheckFailure):
             return
@@ -285,17 +767,27 @@ class Music(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if message.author.bot:
+        # Every message in every guild arrives here, so anything outside a dedicated channel leaves after one lookup
+        guild = message.guild
+        if guild is None or self._dedicated_channels.get(guild.id) != message.channel.id or self.draining:
             return
 
-        guild_id = message.guild.id
-        if guild_id not in self._dedicated_channels:
+        if message.author.bot or not message.content.strip():
             return
 
-        channel_id = message.channel.id
-        if channel_id != self._dedicated_channels[guild_id]:
+        lane = self.get_lane(message.channel)
+        retry_after = await self.request_retry_after(message.author, message.created_at.timestamp())
+        if retry_after is not None:
+            remaining_time = str(timedelta(seconds=int(retry_after))).removeprefix("0:")
+            lane.notify("message.cooldown", remaining_time=remaining_time)
+            await lane.delete_messages([message])
+            return
+        if not lane.check_member(message.author):
+            await lane.delete_messages([message])
             return
 
+        lane.submit(message)
+
     @commands.Cog.listener()
     async def on_voice_state_update(
         self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState
@@ -347,9 +839,19 @@ class Music(commands.Cog):
             logger.error("[TrackStartEvent] Player current track is None")
             return
 
+        self.prefetch(player)
+        self.played_after.record(player.guild_id, current.uri, learn=not current.extra.get("autoplay"))
+        player.store("last_track", current)
+
+        trace = current.extra.pop("trace", None)
+        if trace is not None:
+            trace.start_span("time_to_first_audio", start=trace.start).finish()
+            tracing.tracer.finish(trace)
+
         channel_id = current.extra["channel_id"]
         message_id = current.extra["message_id"]
-        await self.database.insert_playback_history(
+        self.rollups.record(player.guild_id, current)
+        self.history.write(
             PlaybackHistory(
                 channel_id,
                 current.extra["interaction_id"],
@@ -357,12 +859,16 @@ class Music(commands.Cog):
                 current.requester,
                 current.identifier,
                 current.source_name,
-                current.track,
-                current.uri,
-            )
+            ),
+            [current],
         )
 
-        channel = self.bot.get_channel(channel_id)
+        if current.extra.get("dedicated_channel"):
+            # Requests from the dedicated channel are deleted and reflected on the panel instead
+            self.update_lane_panel(player.guild_id)
+            channel = None
+        else:
+            channel = self.bot.get_channel(channel_id)
         if channel is not None:
             message = await channel.fetch_message(message_id)
             if message is not None and message.components:
@@ -374,13 +880,36 @@ class Music(commands.Cog):
             return
         await self.set_voice_channel_status(voice_channel, f"{player.current.title} 듣는 중")
 
+    @lavalink.listener(TrackLoadFailedEvent)
+    async def on_track_load_failed(self, event: TrackLoadFailedEvent):
+        logger.error(f"[TrackLoadFailedEvent] Failed to load {event.track.uri}, skipping to the next track")
+        tracing.finish_track(event.track, "load_failed")
+        await event.player.skip()
+
+    @lavalink.listener(TrackExceptionEvent)
+    async def on_track_exception(self, event: TrackExceptionEvent):
+        tracing.finish_track(event.track, "exception")
+
+    @lavalink.listener(TrackStuckEvent)
+    async def on_track_stuck(self, event: TrackStuckEvent):
+        tracing.finish_track(event.track, "stuck")
+
+    @lavalink.listener(TrackEndEvent)
+    async def on_track_end(self, event: TrackEndEvent):
+        # Only a track that ended without starting still holds its trace
+        tracing.finish_track(event.track, "ended")
+
     @lavalink.listener(QueueEndEvent)
     async def on_queue_end(self, event: QueueEndEvent):
         guild_id = event.player.guild_id
         guild = self.bot.get_guild(guild_id)
 
+        if settings.AUTOPLAY and guild is not None and await self.autoplay(event.player):
+            return
+
         if guild is not None:
             await guild.voice_client.disconnect(force=True)
+        self.update_lane_panel(guild_id)
 
     @lavalink.listener(NodeConnectedEvent)
     async def on_node_connected(self, event: NodeConnectedEvent):
@@ -404,7 +933,9 @@ class Music(commands.Cog):
         return volume
 
     async def create_player(self, guild_id: int, region: str | None = None, node: lavalink.Node | None = None):
-        player = self.lavalink.player_manager.create(guild_id, region=region, node=node)
+        player = self.lavalink.player_manager.create(guild_id, region=region, node=node, cls=Player)
+        # A new player is a new session, autoplay must not link it to the last track of the previous one
+        self.played_after.reset(guild_id)
         await player.set_filter(Volume(0.5))
         return player
 
@@ -419,7 +950,7 @@ class Music(commands.Cog):
             logger.exception("[VoiceChannelStatus] Failed to set voice channel status")
 
     async def cleanup_player(self, guild_id: int, player: lavalink.DefaultPlayer):
-        player.queue.clear()
+        self.clear_queue(player)
 
         try:
             await player.stop()
@@ -436,6 +967,12 @@ class Music(commands.Cog):
         except Exception:
             logger.error("[VoiceClient] Failed to disconnect voice client")
 
+    @staticmethod
+    def clear_queue(player: lavalink.DefaultPlayer):
+        for track in (player.current, *player.queue):
+            tracing.finish_track(track, "cleared")
+        player.queue.clear()
+
     def create_disconnect_task(self, guild_id: int):
         dt = datetime.now() + timedelta(minutes=5)
         task = self._loop.create_task(self._disconnect(dt, guild_id))
@@ -461,6 +998,201 @@ class Music(commands.Cog):
         except Exception:
             logger.exception("[AutoDisconnect] Failed to disconnect voice client automatically")
 
+    def collect_metrics(self):
+        players_by_node = {node.name: 0 for node in self.lavalink.node_manager.nodes}
+        metrics.queue_length.clear()
+        for player in self.lavalink.player_manager.players.values():
+            if player.node is not None:
+                players_by_node[player.node.name] = players_by_node.get(player.node.name, 0) + 1
+            metrics.queue_length.observe(len(player.queue))
+        for node, count in players_by_node.items():
+            metrics.active_players.labels(node).set(count)
+
+    async def render_queue_page(
+        self, interaction: discord.Interaction, player: Player, page: int
+    ) -> tuple[str, int, int]:
+        queue = player.queue
+        pages = max(1, -(-len(queue) // QUEUE_PAGE_SIZE))
+        page = page % pages if page < 0 else min(page, pages - 1)
+
+        # Pages are rendered once per queue state, so flipping through a long queue only slices a page
+        key = (page, interaction.locale)
+        content = player.get_page(key)
+        if content is not None:
+            return content, page, pages
+
+        state = player.pages_state
+        lines = []
+        current = player.current
+        if current is not None:
+            lines.append(
+                await utils.translate(
+                    interaction,
+                    "message.queue.now_playing",
+                    cached=False,
+                    title=current.title,
+                    duration=await self.format_length(interaction, current),
+                )
+            )
+
+        if not queue:
+            lines.append(await utils.translate(interaction, "message.queue.empty"))
+        else:
+            lines.append(
+                await utils.translate(
+                    interaction,
+                    "message.queue.summary",
+                    cached=False,
+                    count=len(queue),
+                    duration=utils.format_duration(queue.duration),
+                )
+            )
+            start = page * QUEUE_PAGE_SIZE
+            for index, track in enumerate(queue[start : start + QUEUE_PAGE_SIZE], start + 1):
+                lines.append(
+                    await utils.translate(
+                        interaction,
+                        "message.queue.item",
+                        cached=False,
+                        index=index,
+                        title=track.title,
+                        duration=await self.format_length(interaction, track),
+                        requester=track.requester,
+                    )
+                )
+            requesters = ", ".join(f"<@{user_id}> `{count}`" for user_id, count in queue.requesters.most_common(3))
+            lines.append(
+                await utils.translate(interaction, "message.queue.requesters", cached=False, requesters=requesters)
+            )
+            lines.append(await utils.translate(interaction, "message.queue.page", page=page + 1, pages=pages))
+
+        content = "\n".join(lines)
+        player.set_page(state, key, content)
+        return content, page, pages
+
+    @staticmethod
+    async def format_length(interaction: discord.Interaction, track: lavalink.AudioTrack) -> str:
+        if track.stream:
+            return await utils.translate(interaction, "message.queue.live")
+        return utils.format_duration(track.duration)
+
+    async def search_tracks(self, query: str, *, timeout: float | None = None) -> list[lavalink.AudioTrack] | None:
+        tracks = self.search_cache.get(query)
+        if tracks is not None:
+            return tracks
+
+        # Identical lookups in flight are shared, so a popular query hits Lavalink once
+        key = normalize_query(query)
+        task = self._searches.get(key)
+        if task is None:
+            task = self._loop.create_task(self._search(query))
+            self._searches[key] = task
+            task.add_done_callback(lambda task: self._search_done(key, task))
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def _search_done(self, key: str, task: asyncio.Task):
+        self._searches.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[Search] Failed to search tracks: {task.exception()}")
+
+    async def _search(self, query: str) -> list[lavalink.AudioTrack] | None:
+        node = self.admission.select_node()
+        if node is None:
+            nodes = self.lavalink.node_manager.available_nodes
+            if not nodes:
+                return None
+            node = nodes[0]
+
+        start = time.perf_counter()
+        results = await node.get_tracks(f"ytsearch:{query}")
+        metrics.lavalink_load_latency.labels(results.load_type.value).observe(time.perf_counter() - start)
+        if results.load_type == LoadType.ERROR:
+            return None
+
+        tracks = results.tracks[:SEARCH_RESULTS] if results.load_type == LoadType.SEARCH else []
+        self.search_cache.put(query, tracks)
+        return tracks
+
+    def add_tracks(
+        self, player: Player, tracks: list[lavalink.AudioTrack], requester: int, **context
+    ) -> list[lavalink.AudioTrack]:
+        # Large playlists are queued as lazy entries, only the head stays decoded so playback starts right away
+        lazy = 0 < settings.LAZY_QUEUE_THRESHOLD < len(tracks)
+        queued = []
+        for index, track in enumerate(tracks):
+            if lazy and index >= settings.QUEUE_PREFETCH:
+                track = LazyTrack(track, context)
+            else:
+                track.extra.update(context)
+            player.add(track, requester=requester)
+            queued.append(track)
+        self.prefetch(player)
+        return queued
+
+    async def autoplay(self, player: Player) -> bool:
+        uri = self.played_after.next(player.guild_id)
+        last_track = player.fetch("last_track")
+        if uri is None or last_track is None:
+            return False
+
+        try:
+            results = await player.node.get_tracks(uri)
+        except Exception:
+            logger.exception("[Autoplay] Failed to load the next track")
+            return False
+        if not results.tracks:
+            return False
+
+        # The autoplayed track inherits the request context of the track it follows
+        context = {
+            key: value for key, value in last_track.extra.items() if key not in ("requester", "trace", "autoplay")
+        }
+        self.add_tracks(player, [results.tracks[0]], last_track.requester, autoplay=True, **context)
+        await player.play()
+        return True
+
+    def prefetch(self, player: Player):
+        for track in player.queue[: settings.QUEUE_PREFETCH]:
+            if isinstance(track, LazyTrack):
+                track.prefetch(self.lavalink)
+
+    async def discard_idle_player(self, guild: discord.Guild, player: Player):
+        if player.is_playing or player.queue:
+            return
+        # Leaving the voice channel also destroys the player, rolling back a speculative connect
+        if guild.voice_client is not None:
+            await guild.voice_client.disconnect(force=True)
+        else:
+            await player.destroy()
+
+    def get_lane(self, channel: discord.TextChannel) -> RequestLane:
+        guild = channel.guild
+        lane = self._lanes.get(guild.id)
+        if lane is None:
+            lane = self._lanes[guild.id] = RequestLane(self, guild, channel)
+        return lane
+
+    async def request_retry_after(self, member: discord.Member, now: float) -> float | None:
+        # Requests from the dedicated channel and picked search results are rate limited like /play,
+        # with buckets of their own
+        cooldowns = self._request_cooldowns
+        for key in [key for key, cooldown in cooldowns.items() if cooldown.get_tokens(now) == cooldown.rate]:
+            del cooldowns[key]
+
+        key = (member.guild.id, member.id)
+        cooldown = cooldowns.get(key)
+        if cooldown is None:
+            cooldown = await request_cooldown(self.bot, member)
+            if cooldown is None:
+                return None
+            cooldowns[key] = cooldown
+        return cooldown.update_rate_limit(now)
+
+    def update_lane_panel(self, guild_id: int):
+        lane = self._lanes.get(guild_id)
+        if lane is not None:
+            lane.schedule_panel_update()
+
     def get_lock(self, guild_id: int) -> asyncio.Lock:
         if guild_id not in self._locks:
             self._locks[guild_id] = asyncio.Lock()
@@ -476,34 +1208,78 @@ class Music(commands.Cog):
     @is_channel_not_full()
     @can_join_voice_channel()
     @ensure_voice_state()
-    @has_available_nodes()
+    @has_available_nodes(healthy=True)
     @app_commands.checks.bot_has_permissions(connect=True, speak=True)
     @app_commands.checks.dynamic_cooldown(dynamic_cooldown, key=lambda i: (i.guild_id, i.user.id))
     async def play(self, interaction: discord.Interaction, query: str):
-        response = await interaction.response.defer(thinking=True)
+        trace = tracing.get_trace(interaction)
+        if trace is not None:
+            trace.start_span("checks", start=trace.start).finish()
+
+        with tracing.span(trace, "defer"):
+            response = await interaction.response.defer(thinking=True)
+        await self.enqueue(interaction, response, query)
+
+    async def enqueue(
+        self, interaction: discord.Interaction, response, query: str, *, track: lavalink.AudioTrack | None = None
+    ):
+        trace = tracing.get_trace(interaction)
         lock = self.get_lock(interaction.guild_id)
+        lock_wait = tracing.start_span(trace, "lock_wait")
         async with lock:
-            player = await self.create_player(interaction.guild_id)
+            lock_wait.finish()
+            player = await self.create_player(interaction.guild_id, node=self.admission.select_node())
             original_query = query
             if utils.is_url(query.strip("<>")):
                 query = query.strip("<>")
             else:
                 query = f"ytsearch:{query}"
-            results = await player.node.get_tracks(query)
+
+            guild = interaction.guild
+            voice_channel = interaction.user.voice.channel
+            connect = guild.me.voice is None and guild.voice_client is None
+            if connect and settings.SPECULATIVE_VOICE_CONNECT:
+                # The voice handshake completes in the background while the tracks resolve
+                with tracing.span(trace, "voice_connect", speculative=True):
+                    await voice_channel.connect(cls=VoiceClient, self_deaf=True)
+                player.store("channel", voice_channel.id)
+                connect = False
+
+            if track is not None:
+                # A track picked from the search results is already resolved, the copy keeps the cached one untouched
+                results = lavalink.LoadResult(LoadType.TRACK, [lavalink.AudioTrack(track)])
+            else:
+                try:
+                    with tracing.span(trace, "get_tracks") as span:
+                        start = time.perf_counter()
+                        results = await player.node.get_tracks(query)
+                        metrics.lavalink_load_latency.labels(results.load_type.value).observe(
+                            time.perf_counter() - start
+                        )
+                        span.set("load_type", results.load_type.value)
+                except Exception:
+                    await self.discard_idle_player(guild, player)
+                    raise
+
             if results.load_type == LoadType.EMPTY:
-                if not player.is_playing and not player.queue:
-                    await player.destroy()
+                await self.discard_idle_player(guild, player)
                 await utils.send_message(interaction, "message.play.not_found", query=original_query)
                 return
             elif results.load_type == LoadType.ERROR:
+                await self.discard_idle_player(guild, player)
                 await utils.send_message(interaction, "message.play.load_failed")
                 logger.error(f"[Play] Failed to load result: {results.error.message}")
                 return
+            elif results.load_type == LoadType.PLAYLIST and not self.admission.admit_playlist(
+                player.node, len(results.tracks)
+            ):
+                await self.discard_idle_player(guild, player)
+                await utils.send_message(interaction, "message.nodes.busy_playlist")
+                return
 
-            voice = interaction.guild.me.voice
-            voice_channel = interaction.user.voice.channel
-            if voice is None:
-                await voice_channel.connect(cls=VoiceClient, self_deaf=True)
+            if connect:
+                with tracing.span(trace, "voice_connect"):
+                    await voice_channel.connect(cls=VoiceClient, self_deaf=True)
                 player.store("channel", voice_channel.id)
 
             if results.load_type == LoadType.TRACK or results.load_type == LoadType.SEARCH:
@@ -511,44 +1287,55 @@ class Music(commands.Cog):
             elif results.load_type == LoadType.PLAYLIST:
                 tracks = results.tracks
 
-            for track in tracks:
-                track.extra["query"] = original_query
-                track.extra["interaction_id"] = response.id
-                track.extra["message_id"] = response.message_id
-                track.extra["channel_id"] = interaction.channel_id
-                track.extra["locale"] = interaction.locale
-
-                player.add(track, requester=interaction.user.id)
-
-            name = results.playlist_info.name if results.load_type == LoadType.PLAYLIST else track.title
-            if player.is_playing:
-                key = f"message.queue.{'playlist' if results.load_type == LoadType.PLAYLIST else 'track'}_added"
-                view = QueuedItemView(self, interaction.user.id)
-                view.message = await utils.send_message(interaction, key, view=view, name=name)
-            else:
-                key = f"message.play.{'playlist' if results.load_type == LoadType.PLAYLIST else 'track'}"
-                await utils.send_message(interaction, key, name=name)
+            queued = self.add_tracks(
+                player,
+                tracks,
+                interaction.user.id,
+                query=original_query,
+                interaction_id=response.id,
+                message_id=response.message_id,
+                channel_id=interaction.channel_id,
+                locale=interaction.locale,
+            )
 
-            if not player.is_playing:
-                volume = await self.get_volume(voice_channel)
-                if volume == 100:
-                    await player.play()
+            name = results.playlist_info.name if results.load_type == LoadType.PLAYLIST else tracks[0].title
+            with tracing.span(trace, "reply"):
+                if player.is_playing:
+                    key = f"message.queue.{'playlist' if results.load_type == LoadType.PLAYLIST else 'track'}_added"
+                    view = QueuedItemView(self, interaction.user.id)
+                    view.message = await utils.send_message(interaction, key, view=view, name=name)
                 else:
-                    await player.play(volume=volume)
+                    key = f"message.play.{'playlist' if results.load_type == LoadType.PLAYLIST else 'track'}"
+                    await utils.send_message(interaction, key, name=name)
 
-            await self.database.insert_play_command_history(
-                PlayCommandHistory.from_dict(
-                    {
-                        "channel_id": interaction.channel_id,
-                        "interaction_id": interaction.id,
-                        "message_id": response.message_id,
-                        "user_id": interaction.user.id,
-                        "query": original_query,
-                        "load_type": "playlist" if results.load_type == LoadType.PLAYLIST else "track",
-                        "tracks": tracks,
-                    }
+            if not player.is_playing:
+                with tracing.span(trace, "get_volume"):
+                    volume = await self.get_volume(voice_channel)
+                if trace is not None and player.queue and player.queue[0] is queued[0]:
+                    # The trace is closed by on_track_start once the queued entry actually starts, otherwise it is
+                    # left on the interaction and closed when the command completes
+                    queued[0].extra["trace"] = interaction.extras.pop("trace")
+                with tracing.span(trace, "player_play"):
+                    if volume == 100:
+                        await player.play()
+                    else:
+                        await player.play(volume=volume)
+
+            with tracing.span(trace, "history_insert"):
+                self.history.write(
+                    PlayCommandHistory.from_dict(
+                        {
+                            "channel_id": interaction.channel_id,
+                            "interaction_id": interaction.id,
+                            "message_id": response.message_id,
+                            "user_id": interaction.user.id,
+                            "query": original_query,
+                            "load_type": "playlist" if results.load_type == LoadType.PLAYLIST else "track",
+                            "tracks": tracks,
+                        }
+                    ),
+                    tracks,
                 )
-            )
 
     @play.error
     async def on_play_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
@@ -581,9 +1368,63 @@ class Music(commands.Cog):
     @is_channel_not_full()
     @can_join_voice_channel()
     @ensure_voice_state()
-    @has_available_nodes()
+    @has_available_nodes(healthy=True)
     async def search(self, interaction: discord.Interaction, query: str):
-        pass
+        response = await interaction.response.defer(thinking=True)
+
+        if utils.is_url(query.strip("<>")):
+            # A suggestion picked from the autocomplete resolves to the track's URL
+            await self.enqueue(interaction, response, query)
+        else:
+            try:
+                tracks = await self.search_tracks(query)
+            except Exception:
+                logger.exception("[Search] Failed to search tracks")
+                tracks = None
+
+            if tracks is None:
+                await utils.send_message(interaction, "message.play.load_failed")
+            elif not tracks:
+                await utils.send_message(interaction, "message.play.not_found", query=query)
+            else:
+                placeholder = await utils.translate(interaction, "message.search.placeholder")
+                view = SearchResultView(self, interaction.user.id, tracks, placeholder)
+                view.message = await utils.send_message(interaction, "message.search.results", view=view, query=query)
+
+        self.history.write(
+            QueryHistory("search", interaction.guild_id, interaction.channel_id, interaction.user.id, query)
+        )
+
+    @search.autocomplete("query")
+    async def search_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        # Autocomplete responses are only accepted within 3 seconds of the interaction
+        deadline = time.perf_counter() + settings.SEARCH_AUTOCOMPLETE_TIMEOUT
+        current = current.strip()
+        if len(current) < 2 or utils.is_url(current):
+            return []
+
+        tracks = self.search_cache.lookup(current)
+        if tracks is None:
+            if not await self.search_debouncer.wait(interaction.user.id):
+                return []
+            try:
+                tracks = await self.search_tracks(current, timeout=deadline - time.perf_counter())
+            except Exception:
+                tracks = None
+
+        return [
+            app_commands.Choice(
+                name=f"{track.title} - {track.author}"[:100],
+                value=track.uri if len(track.uri) <= 100 else track.title[:100],
+            )
+            for track in tracks or []
+        ]
+
+    @search.error
+    async def on_search_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        await self.on_play_error(interaction, error)
 
     @app_commands.command(
         name=_T("skip", key="command.skip"), description=_T("description", key="command.skip.description")
@@ -606,6 +1447,16 @@ class Music(commands.Cog):
         else:
             await utils.send_message(interaction, "message.skip.no_permission", ephemeral=True)
 
+    @app_commands.command(
+        name=_T("queue", key="command.queue"), description=_T("description", key="command.queue.description")
+    )
+    @is_playing()
+    async def queue(self, interaction: discord.Interaction):
+        player = self.get_player(interaction.guild_id)
+        content, page, pages = await self.render_queue_page(interaction, player, 0)
+        view = QueueView(self, interaction, page, pages) if pages > 1 else MISSING
+        await utils.send(interaction, content, view=view, allowed_mentions=discord.AllowedMentions.none())
+
     @app_commands.command(
         name=_T("pause", key="command.pause"), description=_T("description", key="command.pause.description")
     )
@@ -642,7 +1493,7 @@ class Music(commands.Cog):
     @has_available_nodes()
     async def stop(self, interaction: discord.Interaction):
         player = self.get_player(interaction.guild_id)
-        player.queue.clear()
+        self.clear_queue(player)
         await player.stop()
         await interaction.guild.voice_client.disconnect()
         await utils.send_message(interaction, "message.player.stopped")
@@ -700,6 +1551,9 @@ class Music(commands.Cog):
             await utils.send_message(interaction, "message.dedicated_channel.current", channel=text_channel.mention)
             return
         self._dedicated_channels[guild_id] = channel.id
+        lane = self._lanes.pop(guild_id, None)
+        if lane is not None:
+            lane.close()
         await self.database.set_dedicated_channel(guild_id, channel.id)
         await utils.send_message(interaction, "message.dedicated_channel.updated", channel=channel.mention)
 
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+import discord
+from discord import app_commands
+from discord.app_commands import locale_str as _T
+from discord.ext import commands
+
+import utils
+from settings import settings
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+logger = logging.getLogger("bot.stats")
+
+TOP_TRACKS = 5
+TOP_REQUESTERS = 3
+BUSIEST_HOURS = 3
+
+
+class Stats(commands.Cog):
+    def __init__(self, bot: Bot):
+        self.bot: Bot = bot
+        self.database = self.bot.database
+
+    async def get_guild_stats(self, guild_id: int, days: int) -> dict:
+        # Read from the rollups, so the playback history is never scanned
+        now = datetime.now(timezone.utc)
+        since = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        daily = await self.database.get_guild_rollups(guild_id, "day", since)
+        hourly = await self.database.get_guild_rollups(guild_id, "hour", since)
+        top_tracks = await self.database.get_top_tracks(guild_id, since, TOP_TRACKS)
+
+        requesters = Counter()
+        for document in daily:
+            requesters.update({int(user_id): count for user_id, count in document.get("requesters", {}).items()})
+
+        hours = Counter()
+        for document in hourly:
+            hours[document["start"].hour] += document["plays"]
+
+        return {
+            "plays": sum(document["plays"] for document in daily),
+            "top_tracks": [(document["title"], document["plays"]) for document in top_tracks],
+            "top_requesters": requesters.most_common(TOP_REQUESTERS),
+            "busiest_hours": hours.most_common(BUSIEST_HOURS),
+        }
+
+    @app_commands.command(
+        name=_T("stats", key="command.stats"), description=_T("description", key="command.stats.description")
+    )
+    @app_commands.rename(days=_T("days", key="option.stats.days"))
+    @app_commands.describe(days=_T("description", key="option.stats.days.description"))
+    async def stats(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, 30] | None = None):
+        days = days or settings.STATS_DAYS
+        await interaction.response.defer()
+        stats = await self.get_guild_stats(interaction.guild_id, days)
+        if not stats["plays"]:
+            await utils.send_message(interaction, "message.stats.empty", days=days)
+            return
+
+        lines = [
+            await utils.translate(interaction, "message.stats.summary", cached=False, days=days, plays=stats["plays"])
+        ]
+
+        lines.append(await utils.translate(interaction, "message.stats.top_tracks"))
+        for index, (title, plays) in enumerate(stats["top_tracks"], start=1):
+            lines.append(
+                await utils.translate(
+                    interaction, "message.stats.track", cached=False, index=index, title=title, plays=plays
+                )
+            )
+
+        hours = ", ".join(f"{hour:02d}:00" for hour, _ in stats["busiest_hours"])
+        lines.append(await utils.translate(interaction, "message.stats.busiest_hours", cached=False, hours=hours))
+
+        requesters = ", ".join(f"<@{user_id}> `{count}`" for user_id, count in stats["top_requesters"])
+        lines.append(
+            await utils.translate(interaction, "message.stats.top_requesters", cached=False, requesters=requesters)
+        )
+
+        await utils.send(interaction, "\n".join(lines), allowed_mentions=discord.AllowedMentions.none())
+
+
+async def setup(bot: Bot):
+    await bot.add_cog(Stats(bot))
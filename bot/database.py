@@ -1,15 +1,40 @@
+import functools
 import logging
-from dataclasses import asdict
+import time
 from datetime import datetime, timezone
 
-from pymongo import AsyncMongoClient
-from pymongo.errors import ConnectionFailure
+from bson import ObjectId
+from pymongo import AsyncMongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure
 
-from models import PlaybackHistory, PlayCommandHistory, QueryHistory
+import metrics
 
 logger = logging.getLogger("bot.database")
 logger.setLevel(logging.WARNING)
 
+DUPLICATE_KEY_ERROR = 11000
+# Flushes remembered per rollup document, only the pending one is ever retried
+ROLLUP_FLUSHES = 10
+
+
+def instrumented(func):
+    name = func.__name__
+    latency = metrics.database_latency.labels(name)
+    errors = metrics.database_errors.labels(name)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+
+    return wrapper
+
 
 class Database:
     def __init__(
@@ -27,10 +52,12 @@ class Database:
     async def close(self):
         await self.client.close()
 
+    @instrumented
     async def set_channel_volume(self, channel_id: int, volume: int):
         collection = self.database["channel_volumes"]
         await collection.update_one({"channel_id": channel_id}, {"$set": {"volume": volume}}, upsert=True)
 
+    @instrumented
     async def get_channel_volume(self, channel_id: int) -> int | None:
         collection = self.database["channel_volumes"]
         document = await collection.find_one({"channel_id": channel_id})
@@ -38,10 +65,12 @@ class Database:
             return None
         return document["volume"]
 
+    @instrumented
     async def set_default_volume(self, guild_id: int, volume: int):
         collection = self.database["default_volumes"]
         await collection.update_one({"guild_id": guild_id}, {"$set": {"volume": volume}}, upsert=True)
 
+    @instrumented
     async def get_default_volume(self, guild_id: int) -> int | None:
         collection = self.database["default_volumes"]
         document = await collection.find_one({"guild_id": guild_id})
@@ -49,14 +78,19 @@ class Database:
             return None
         return document["volume"]
 
+    @instrumented
     async def set_dedicated_channel(self, guild_id: int, channel_id: int):
         collection = self.database["dedicated_channels"]
         await collection.update_one(
             {"guild_id": guild_id},
-            {"$set": {"channel_id": channel_id, "updated_at": datetime.now(timezone.utc)}},
+            {
+                "$set": {"channel_id": channel_id, "updated_at": datetime.now(timezone.utc)},
+                "$unset": {"panel_message_id": ""},
+            },
             upsert=True,
         )
 
+    @instrumented
     async def get_dedicated_channel(self, guild_id: int) -> int | None:
         collection = self.database["dedicated_channels"]
         document = await collection.find_one({"guild_id": guild_id})
@@ -64,6 +98,7 @@ class Database:
             return None
         return document["channel_id"]
 
+    @instrumented
     async def get_dedicated_channels(self) -> dict[int, int]:
         dedicated_channels = {}
         collection = self.database["dedicated_channels"]
@@ -72,14 +107,165 @@ class Database:
                 dedicated_channels[document["guild_id"]] = document["channel_id"]
         return dedicated_channels
 
-    async def insert_playback_history(self, history: PlaybackHistory):
-        collection = self.database["playback_history"]
-        await collection.insert_one(asdict(history))
+    @instrumented
+    async def set_panel_message(self, guild_id: int, message_id: int):
+        collection = self.database["dedicated_channels"]
+        await collection.update_one({"guild_id": guild_id}, {"$set": {"panel_message_id": message_id}})
+
+    @instrumented
+    async def get_panel_message(self, guild_id: int) -> int | None:
+        collection = self.database["dedicated_channels"]
+        document = await collection.find_one({"guild_id": guild_id})
+        if document is None:
+            return None
+        return document.get("panel_message_id")
+
+    @instrumented
+    async def get_played_after(self, guild_id: int) -> dict[str, list[tuple[str, int]]]:
+        played_after = {}
+        collection = self.database["played_after"]
+        async with collection.find({"guild_id": guild_id}) as cursor:
+            async for document in cursor:
+                played_after[document["uri"]] = [(uri, count) for uri, count in document["next"]]
+        return played_after
+
+    @instrumented
+    async def save_played_after(self, guild_id: int, entries: dict[str, list[tuple[str, int]]]):
+        collection = self.database["played_after"]
+        now = datetime.now(timezone.utc)
+        await collection.bulk_write(
+            [
+                UpdateOne(
+                    {"guild_id": guild_id, "uri": uri},
+                    {"$set": {"next": [[candidate, count] for candidate, count in candidates], "updated_at": now}},
+                    upsert=True,
+                )
+                for uri, candidates in entries.items()
+            ],
+            ordered=False,
+        )
+
+    @instrumented
+    async def create_rollup_indexes(self):
+        await self.database["guild_rollups"].create_index([("guild_id", 1), ("period", 1), ("start", 1)], unique=True)
+        await self.database["track_rollups"].create_index(
+            [("guild_id", 1), ("period", 1), ("start", 1), ("source_name", 1), ("identifier", 1)], unique=True
+        )
+
+    async def _apply_rollups(self, collection: str, flush_id: ObjectId, requests: list[tuple[dict, dict]]) -> list[int]:
+        # A rollup document remembers the last flushes applied to it, so retrying a flush never increments it twice.
+        # Once applied, the filter no longer matches and the upsert fails on the unique index instead
+        try:
+            await self.database[collection].bulk_write(
+                [
+                    UpdateOne(
+                        {**query, "flushes": {"$ne": flush_id}},
+                        {**update, "$push": {"flushes": {"$each": [flush_id], "$slice": -ROLLUP_FLUSHES}}},
+                        upsert=True,
+                    )
+                    for query, update in requests
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            details = e.details
+            if details.get("writeConcernErrors"):
+                raise
+            return [error["index"] for error in details.get("writeErrors", []) if error["code"] != DUPLICATE_KEY_ERROR]
+        return []
+
+    @instrumented
+    async def apply_guild_rollups(
+        self, flush_id: ObjectId, rollups: list[tuple[int, str, datetime, int, dict[str, int]]]
+    ) -> list[int]:
+        return await self._apply_rollups(
+            "guild_rollups",
+            flush_id,
+            [
+                (
+                    {"guild_id": guild_id, "period": period, "start": start},
+                    {
+                        "$inc": {
+                            "plays": plays,
+                            **{f"requesters.{user_id}": count for user_id, count in requesters.items()},
+                        }
+                    },
+                )
+                for guild_id, period, start, plays, requesters in rollups
+            ],
+        )
+
+    @instrumented
+    async def apply_track_rollups(
+        self, flush_id: ObjectId, rollups: list[tuple[int, str, datetime, str, str, str | None, int]]
+    ) -> list[int]:
+        return await self._apply_rollups(
+            "track_rollups",
+            flush_id,
+            [
+                (
+                    {
+                        "guild_id": guild_id,
+                        "period": period,
+                        "start": start,
+                        "source_name": source_name,
+                        "identifier": identifier,
+                    },
+                    {"$inc": {"plays": plays}, "$set": {"title": title}},
+                )
+                for guild_id, period, start, source_name, identifier, title, plays in rollups
+            ],
+        )
+
+    @instrumented
+    async def get_guild_rollups(self, guild_id: int, period: str, since: datetime) -> list[dict]:
+        collection = self.database["guild_rollups"]
+        async with collection.find(
+            {"guild_id": guild_id, "period": period, "start": {"$gte": since}}, {"flushes": 0}
+        ) as cursor:
+            return [document async for document in cursor]
+
+    @instrumented
+    async def get_top_tracks(self, guild_id: int, since: datetime, limit: int = 10) -> list[dict]:
+        collection = self.database["track_rollups"]
+        pipeline = [
+            {"$match": {"guild_id": guild_id, "period": "day", "start": {"$gte": since}}},
+            {
+                "$group": {
+                    "_id": {"source_name": "$source_name", "identifier": "$identifier"},
+                    "title": {"$last": "$title"},
+                    "plays": {"$sum": "$plays"},
+                }
+            },
+            {"$sort": {"plays": -1}},
+            {"$limit": limit},
+        ]
+        async with await collection.aggregate(pipeline) as cursor:
+            return [document async for document in cursor]
 
-    async def insert_play_command_history(self, history: PlayCommandHistory):
-        collection = self.database["play_command_history"]
-        await collection.insert_one(asdict(history))
+    @instrumented
+    async def save_tracks(self, documents: list[dict]):
+        requests = []
+        for document in documents:
+            # Tracks are keyed by source and identifier, later copies only fill in the fields that are still missing
+            fields = {
+                name: {"$ifNull": [f"${name}", {"$literal": value}]}
+                for name, value in document.items()
+                if name not in ("_id", "track")
+            }
+            if document["track"] is not None:
+                fields["track"] = {"$literal": document["track"]}
+            requests.append(UpdateOne({"_id": document["_id"]}, [{"$set": fields}], upsert=True))
+        await self.database["tracks"].bulk_write(requests, ordered=False)
 
-    async def insert_query_history(self, history: QueryHistory):
-        collection = self.database["query_history"]
-        await collection.insert_one(asdict(history))
+    @instrumented
+    async def insert_history(self, collection: str, documents: list[dict]):
+        try:
+            await self.database[collection].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Replayed documents that were already written are skipped by their _id
+            details = e.details
+            if details.get("writeConcernErrors") or any(
+                error["code"] != DUPLICATE_KEY_ERROR for error in details.get("writeErrors", [])
+            ):
+                raise
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+import runtime
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+logger = logging.getLogger("bot.emojis")
+
+
+class EmojiRegistry:
+    def __init__(self, bot: Bot, *, cache_path: str = "cache/emojis.json"):
+        self.bot: Bot = bot
+        self.cache_path = Path(cache_path)
+        self.emojis: dict[str, str] = {}
+        self._listeners: list[Callable[[dict[str, str]], None]] = []
+        self._refresh_task: asyncio.Task | None = None
+
+    def add_listener(self, listener: Callable[[dict[str, str]], None]):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict[str, str]], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def load(self):
+        if not self.cache_path.is_file():
+            logger.info("[Emoji] No cached emojis found, waiting for refresh")
+            return
+
+        try:
+            emojis = runtime.loads(self.cache_path.read_bytes())
+        except Exception:
+            logger.exception("[Emoji] Failed to load cached emojis")
+            return
+
+        self.update(emojis)
+        logger.info(f"[Emoji] Loaded {len(emojis)} cached emojis")
+
+    def save(self, emojis: dict[str, str]):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(emojis, f, ensure_ascii=False, indent=4, sort_keys=True)
+        tmp_path.replace(self.cache_path)
+
+    def update(self, emojis: dict[str, str]):
+        # Swap the whole mapping so readers never observe a partially updated dict
+        self.emojis = emojis
+        for listener in self._listeners:
+            try:
+                listener(emojis)
+            except Exception:
+                logger.exception("[Emoji] Listener failed to apply emoji update")
+
+    def start(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        try:
+            emojis = await self.bot.fetch_application_emojis()
+        except Exception:
+            logger.exception("[Emoji] Failed to fetch application emojis")
+            return
+
+        mapping = {emoji.name: f"<:{emoji.name}:{emoji.id}>" for emoji in emojis}
+        if mapping == self.emojis:
+            logger.info("[Emoji] Cached emojis are up to date")
+            return
+
+        self.update(mapping)
+        logger.info(f"[Emoji] Refreshed {len(mapping)} application emojis")
+
+        try:
+            await asyncio.to_thread(self.save, mapping)
+        except Exception:
+            logger.exception("[Emoji] Failed to save emoji cache")
+
+    async def close(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            return
+        self._refresh_task.cancel()
+        try:
+            await self._refresh_task
+        except asyncio.CancelledError:
+            pass
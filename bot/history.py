@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import bson
+from lavalink import AudioTrack
+
+import metrics
+from models import (
+    PlaybackHistory,
+    PlayCommandHistory,
+    QueryHistory,
+    encode_track,
+    track_id,
+)
+
+logger = logging.getLogger("bot.history")
+
+COLLECTIONS = {
+    PlaybackHistory: "playback_history",
+    PlayCommandHistory: "play_command_history",
+    QueryHistory: "query_history",
+}
+
+# Every record is framed as <length><crc32> followed by a BSON document, so a torn or corrupt frame is detected and
+# the reader resyncs on the next valid frame
+FRAME_HEADER = struct.Struct("<II")
+MAX_RECORD_SIZE = 16 * 1024 * 1024
+
+
+class HistorySpool:
+    def __init__(self, path: str = "spool/history.spool", *, fsync_interval: float = 0.05):
+        self.path = Path(path)
+        self.replay_path = self.path.with_name(self.path.name + ".replay")
+        self.fsync_interval = fsync_interval
+        self.corrupt_bytes = 0
+        self._buffer: list[bytes] = []
+        self._flush_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def append(self, collection: str, document: dict):
+        payload = bson.encode({"c": collection, "d": document})
+        self._buffer.append(FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+        # Records arriving within the interval share one write and one fsync
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def write(self, frames: list[bytes]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as f:
+            f.write(b"".join(frames))
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            frames, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self.write, frames)
+            except Exception:
+                logger.exception("[History] Failed to write the spool, keeping the records in memory")
+                self._buffer[:0] = frames
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.fsync_interval)
+        await self.flush()
+
+    async def rotate(self) -> bool:
+        # New records keep appending to a fresh file while the old one is replayed
+        await self.flush()
+        async with self._lock:
+            if self.replay_path.exists():
+                return True
+            if not self.path.exists() or self.path.stat().st_size == 0:
+                return False
+            self.path.replace(self.replay_path)
+            return True
+
+    def read(self, batch_size: int) -> Iterator[list[tuple[str, dict]]]:
+        self.corrupt_bytes = 0
+        with self.replay_path.open("rb") as f:
+            batch = []
+            offset = 0
+            bad_offset = None
+            while header := f.read(FRAME_HEADER.size):
+                record = None
+                if len(header) == FRAME_HEADER.size:
+                    length, checksum = FRAME_HEADER.unpack(header)
+                    payload = f.read(length) if length <= MAX_RECORD_SIZE else b""
+                    if len(payload) == length and zlib.crc32(payload) == checksum:
+                        try:
+                            record = bson.decode(payload)
+                        except Exception:
+                            pass
+
+                if record is None:
+                    # A torn frame is followed by the records appended after a restart, so scan for the next one
+                    if bad_offset is None:
+                        bad_offset = offset
+                    offset += 1
+                    f.seek(offset)
+                    continue
+
+                if bad_offset is not None:
+                    self.skipped(bad_offset, offset)
+                    bad_offset = None
+                offset += FRAME_HEADER.size + length
+                batch.append((record["c"], record["d"]))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+
+            if bad_offset is not None:
+                self.skipped(bad_offset, offset)
+            if batch:
+                yield batch
+
+    def skipped(self, start: int, end: int):
+        self.corrupt_bytes += end - start
+        logger.warning(f"[History] Skipped {end - start} corrupt bytes at offset {start} of {self.replay_path}")
+
+    def discard(self):
+        if not self.corrupt_bytes:
+            self.replay_path.unlink(missing_ok=True)
+            return
+        # The records that could not be read are kept for inspection instead of being deleted
+        corrupt_path = self.path.with_name(f"{self.path.name}.corrupt-{int(time.time())}")
+        self.replay_path.replace(corrupt_path)
+        logger.warning(f"[History] Moved the spool with {self.corrupt_bytes} corrupt bytes to {corrupt_path}")
+        self.corrupt_bytes = 0
+
+    async def close(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+
+class HistoryWriter:
+    def __init__(
+        self,
+        database,
+        spool: HistorySpool,
+        *,
+        timeout: float = 2.0,
+        replay_interval: float = 10.0,
+        batch_size: int = 500,
+        known_tracks: int = 100000,
+    ):
+        self.database = database
+        self.spool = spool
+        self.timeout = timeout
+        self.replay_interval = replay_interval
+        self.batch_size = batch_size
+        self.max_known_tracks = known_tracks
+        self.healthy = True
+        # Tracks already sent to the tracks collection, and whether their encoded track was included
+        self._known_tracks: OrderedDict[str, bool] = OrderedDict()
+        self._writes: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        await self.spool.close()
+
+    def write(self, history: PlaybackHistory | PlayCommandHistory | QueryHistory, tracks: Iterable[AudioTrack] = ()):
+        collection = COLLECTIONS[type(history)]
+        document = history.to_document()
+        track_documents = self.new_tracks(tracks)
+        if not self.healthy:
+            # While the database is down every record goes straight to the spool instead of waiting for a timeout
+            self._spool(collection, document, track_documents)
+            return
+
+        task = asyncio.create_task(self._insert(collection, document, track_documents))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    def new_tracks(self, tracks: Iterable[AudioTrack]) -> list[dict]:
+        documents = []
+        known_tracks = self._known_tracks
+        for track in tracks:
+            key = track_id(track.source_name, track.identifier)
+            encoded = track.track is not None
+            known = known_tracks.get(key)
+            if known is None or (encoded and not known):
+                documents.append(encode_track(track))
+                known_tracks[key] = encoded
+            known_tracks.move_to_end(key)
+        while len(known_tracks) > self.max_known_tracks:
+            known_tracks.popitem(last=False)
+        return documents
+
+    def _spool(self, collection: str, document: dict, track_documents: list[dict]):
+        for track_document in track_documents:
+            self.spool.append("tracks", track_document)
+        self.spool.append(collection, document)
+        metrics.history_spooled.labels(collection).inc()
+
+    async def _insert(self, collection: str, document: dict, track_documents: list[dict]):
+        try:
+            async with asyncio.timeout(self.timeout):
+                if track_documents:
+                    await self.database.save_tracks(track_documents)
+                await self.database.insert_history(collection, [document])
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"[History] Database write failed, spooling history records: {e!r}")
+            self.healthy = False
+            # A timed out insert may still have landed, the replay skips it by _id
+            self._spool(collection, document, track_documents)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.warning(f"[History] Spool replay failed, retrying later: {e!r}")
+
+    async def replay(self):
+        if not await self.spool.rotate():
+            self.healthy = True
+            return
+
+        # The spool is streamed in batches, it can grow large during a long outage
+        batches = self.spool.read(self.batch_size)
+        replayed = 0
+        try:
+            while (records := await asyncio.to_thread(next, batches, None)) is not None:
+                documents: dict[str, list[dict]] = {}
+                for collection, document in records:
+                    documents.setdefault(collection, []).append(document)
+                for collection, documents in documents.items():
+                    if collection == "tracks":
+                        await self.database.save_tracks(documents)
+                        continue
+                    await self.database.insert_history(collection, documents)
+                    metrics.history_replayed.labels(collection).inc(len(documents))
+                replayed += len(records)
+        finally:
+            batches.close()
+
+        self.spool.discard()
+        self.healthy = True
+        logger.info(f"[History] Replayed {replayed} spooled history records")
@@ -1,6 +1,14 @@
+import copy
 import logging
+import logging.handlers
 import os
+import queue
 import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import runtime
 
 
 def is_docker() -> bool:
@@ -60,5 +68,104 @@ class ColorFormatter(logging.Formatter):
         return output
 
 
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord):
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return runtime.dumps(data)
+
+
 def get_formatter():
     return ColorFormatter() if supports_color() else Formatter()
+
+
+class SizedTimedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    def __init__(self, filename: Path, *, max_bytes: int, backup_count: int, interval: float, encoding: str = "utf-8"):
+        # Like TimedRotatingFileHandler, an existing file is due from its last write and not from this start
+        moment = os.stat(filename).st_mtime if os.path.exists(filename) else time.time()
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.interval = interval
+        self.rollover_at = self.compute_rollover(moment) if interval > 0 else None
+
+    def compute_rollover(self, moment: float) -> float:
+        # Deadlines fall on multiples of the interval (midnight UTC for a day), so restarts never push them back
+        return (moment // self.interval + 1) * self.interval
+
+    def shouldRollover(self, record: logging.LogRecord):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval > 0:
+            self.rollover_at = self.compute_rollover(time.time())
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped: Counter[str] = Counter()
+        self.listener: logging.handlers.QueueListener | None = None
+
+    def prepare(self, record: logging.LogRecord):
+        # Only merge the arguments here; formatting and tracebacks are rendered on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped[record.levelname] += 1
+
+    def start(self, *handlers: logging.Handler):
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+
+        dropped = sum(self.dropped.values())
+        if dropped:
+            sys.stderr.write(f"Logging queue was full, dropped {dropped} record(s): {dict(self.dropped)}\n")
+
+
+def setup_logging(
+    logger: logging.Logger,
+    path: Path,
+    *,
+    level: int = logging.INFO,
+    queue_size: int = 10000,
+    max_bytes: int = 0,
+    backup_count: int = 0,
+    interval: float = 0,
+    json_format: bool = False,
+) -> NonBlockingQueueHandler:
+    stream_handler = logging.StreamHandler()
+    stream_handler.setLevel(level)
+    stream_handler.setFormatter(get_formatter())
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = SizedTimedRotatingFileHandler(
+        path, max_bytes=max_bytes, backup_count=backup_count, interval=interval
+    )
+    file_handler.setLevel(level)
+    file_handler.setFormatter(JsonFormatter() if json_format else Formatter())
+
+    queue_handler = NonBlockingQueueHandler(queue_size)
+    queue_handler.setLevel(level)
+    queue_handler.start(stream_handler, file_handler)
+    logger.addHandler(queue_handler)
+    return queue_handler
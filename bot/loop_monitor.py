@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+import metrics
+
+logger = logging.getLogger("bot.loop_monitor")
+
+
+class LoopMonitor:
+    def __init__(self, *, interval: float = 0.25, threshold: float = 0.5, cooldown: float = 60, window: int = 2400):
+        self.interval = interval
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.samples: deque[float] = deque(maxlen=window)
+        self.stalls: int = 0
+        self.suppressed: int = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat: float = 0
+        self._last_dump: float = 0
+        self._dumped_heartbeat: float = 0
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+
+        self._task = self._loop.create_task(self.measure())
+        self._thread = threading.Thread(target=self.watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+        metrics.registry.add_collector(self.collect_metrics)
+
+    async def stop(self):
+        metrics.registry.remove_collector(self.collect_metrics)
+        self._stopped.set()
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self._heartbeat = time.monotonic()
+            self.samples.append(lag)
+            metrics.event_loop_lag.observe(lag)
+
+    def watch(self):
+        # Runs on its own thread so it can look at the loop while the loop itself is blocked
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or heartbeat == self._dumped_heartbeat:
+                continue
+
+            self._dumped_heartbeat = heartbeat
+            self.stalls += 1
+            metrics.event_loop_stalls.inc()
+
+            now = time.monotonic()
+            if now - self._last_dump < self.cooldown:
+                self.suppressed += 1
+                continue
+            self._last_dump = now
+
+            self.dump(blocked)
+
+    def dump(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        name = task.get_name() if task is not None else "callback"
+
+        suppressed, self.suppressed = self.suppressed, 0
+        logger.warning(
+            f"[LoopMonitor] Event loop blocked for over {blocked * 1000:.0f}ms by {name} "
+            f"({suppressed} stall(s) suppressed since the last report)\n{stack}"
+        )
+
+    def percentiles(self, *quantiles: float) -> dict[float, float]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {quantile: 0.0 for quantile in quantiles}
+        return {quantile: samples[min(int(quantile * len(samples)), len(samples) - 1)] for quantile in quantiles}
+
+    def collect_metrics(self):
+        for quantile, value in self.percentiles(0.5, 0.9, 0.99, 1.0).items():
+            metrics.event_loop_lag_quantiles.labels(quantile).set(value)
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import logging
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable
+
+from aiohttp import web
+
+logger = logging.getLogger("bot.metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUEUE_LENGTH_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._create_child()
+        return child
+
+    def clear(self):
+        self._children = {}
+
+    @abstractmethod
+    def _create_child(self): ...
+
+    @abstractmethod
+    def _samples(self, values: tuple[str, ...], child) -> list[str]: ...
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value: float = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _create_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _samples(self, values, child) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum: float = 0
+        self.count: int = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self, values, child) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        # Collectors refresh scrape-time gauges so nothing has to be maintained on the hot paths
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                logger.exception("[Metrics] Collector failed")
+
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.append("")
+        return "\n".join(lines)
+
+
+class MetricsServer:
+    def __init__(self, registry: Registry, *, host: str = "127.0.0.1", port: int = 9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"[Metrics] Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+
+
+class RateLimitFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        # discord.py only reports REST 429s through its logger, match the format string rather than the message
+        if isinstance(record.msg, str) and record.msg.startswith("We are being rate limited"):
+            method = record.args[0] if record.args else "unknown"
+            discord_rate_limits.labels(method).inc()
+        return True
+
+
+registry = Registry()
+
+command_latency = registry.histogram(
+    "doid_command_latency_seconds", "Time from receiving a command to its first reply", ("command",)
+)
+command_duration = registry.histogram(
+    "doid_command_duration_seconds", "Time from receiving a command to its completion", ("command",)
+)
+lavalink_load_latency = registry.histogram(
+    "doid_lavalink_load_seconds", "Lavalink track loading latency", ("load_type",)
+)
+database_latency = registry.histogram("doid_database_seconds", "Database operation latency", ("method",))
+database_errors = registry.counter("doid_database_errors_total", "Failed database operations", ("method",))
+history_spooled = registry.counter(
+    "doid_history_spooled_total", "History records spooled to disk while the database was unavailable", ("collection",)
+)
+history_replayed = registry.counter(
+    "doid_history_replayed_total", "Spooled history records written back to the database", ("collection",)
+)
+discord_rate_limits = registry.counter(
+    "doid_discord_rate_limited_total", "Discord REST responses with status 429", ("method",)
+)
+admission_rejections = registry.counter(
+    "doid_admission_rejections_total", "Requests rejected because the Lavalink nodes were overloaded", ("reason",)
+)
+active_players = registry.gauge("doid_active_players", "Players connected to each Lavalink node", ("node",))
+queue_length = registry.histogram(
+    "doid_queue_length_tracks", "Queue length of the active players", buckets=QUEUE_LENGTH_BUCKETS
+)
+translation_cache = registry.gauge("doid_translation_cache", "Rendered message cache statistics", ("stat",))
+dropped_log_records = registry.gauge(
+    "doid_dropped_log_records", "Log records dropped because the logging queue was full", ("level",)
+)
+event_loop_lag = registry.histogram(
+    "doid_event_loop_lag_seconds", "Delay of event loop wakeups past their schedule", buckets=LOOP_LAG_BUCKETS
+)
+event_loop_lag_quantiles = registry.gauge(
+    "doid_event_loop_lag_quantile_seconds", "Event loop lag percentiles over the recent window", ("quantile",)
+)
+event_loop_stalls = registry.counter(
+    "doid_event_loop_stalls_total", "Times the event loop was blocked past the threshold"
+)
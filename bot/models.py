@@ -1,23 +1,61 @@
 from dataclasses import dataclass, field, fields
 from datetime import datetime, timezone
+from operator import attrgetter
 from typing import Literal
 
 from bson import ObjectId
 
 
-@dataclass
+def track_id(source_name: str, identifier: str) -> str:
+    return f"{source_name}:{identifier}"
+
+
+def encode_track(track) -> dict:
+    # Built straight from the lavalink AudioTrack, without going through the Track model
+    source_name = track.source_name
+    identifier = track.identifier
+    return {
+        "_id": track_id(source_name, identifier),
+        "source_name": source_name,
+        "identifier": identifier,
+        "title": track.title,
+        "author": track.author,
+        "duration": track.duration,
+        "uri": track.uri,
+        "track": track.track,
+    }
+
+
+def document(cls):
+    # The field names are computed once, so encoding and decoding never inspect the dataclass again
+    cls.FIELDS = tuple(f.name for f in fields(cls))
+    cls.FIELD_SET = frozenset(cls.FIELDS)
+    names = cls.FIELDS
+    values = attrgetter(*names)
+
+    def to_document(self) -> dict:
+        # Unlike dataclasses.asdict, the values are not deep-copied, the documents are only read by the encoder
+        return dict(zip(names, values(self)))
+
+    cls.to_document = to_document
+    return cls
+
+
+@document
+@dataclass(slots=True)
 class Track:
-    author: str
-    duration: int
-    identifier: str
-    requester: int
+    _id: str
     source_name: str
+    identifier: str
     title: str
-    track: str | None
+    author: str
+    duration: int
     uri: str
+    track: str | None
 
 
-@dataclass
+@document
+@dataclass(slots=True)
 class PlayCommandHistory:
     channel_id: int
     interaction_id: int
@@ -25,19 +63,18 @@ class PlayCommandHistory:
     user_id: int
     query: str
     load_type: str
-    tracks: list[Track]
+    tracks: list[str]
     created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     _id: ObjectId = field(default_factory=ObjectId)
 
     @classmethod
     def from_dict(cls, data: dict):
-        track_fields = fields(Track)
-        tracks = [Track(**{f.name: getattr(t, f.name) for f in track_fields}) for t in data.get("tracks", [])]
-        other_data = {k: v for k, v in data.items() if k != "tracks"}
-        return cls(tracks=tracks, **other_data)
+        tracks = [track_id(t.source_name, t.identifier) for t in data.get("tracks", ())]
+        return cls(**{**data, "tracks": tracks})
 
 
-@dataclass
+@document
+@dataclass(slots=True)
 class PlaybackHistory:
     channel_id: int
     interaction_id: int
@@ -45,19 +82,17 @@ class PlaybackHistory:
     user_id: int
     identifier: str
     source_name: str
-    track: str | None
-    uri: str
     played_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     _id: ObjectId = field(default_factory=ObjectId)
 
     @classmethod
     def from_dict(cls, data: dict):
-        class_fields = {f.name for f in fields(cls)}
-        filtered_data = {k: v for k, v in data.items() if k in class_fields}
-        return cls(**filtered_data)
+        class_fields = cls.FIELD_SET
+        return cls(**{k: v for k, v in data.items() if k in class_fields})
 
 
-@dataclass
+@document
+@dataclass(slots=True)
 class QueryHistory:
     type: Literal["play", "search"]
     guild_id: int
@@ -0,0 +1,191 @@
+import asyncio
+import itertools
+import logging
+from collections import Counter
+from typing import Any, Iterable
+
+import lavalink
+from lavalink import AudioTrack, DeferredAudioTrack, LoadType
+
+logger = logging.getLogger("bot.player")
+
+_versions = itertools.count(1)
+
+
+class LazyTrack(DeferredAudioTrack):
+    __slots__ = ("_loading",)
+
+    def __init__(self, track: AudioTrack, extra: dict[str, Any]):
+        # AudioTrack.__init__ is skipped on purpose, it keeps the raw payload and the encoded track alive
+        self.raw = None
+        self.track = None
+        self.identifier = track.identifier
+        self.is_seekable = track.is_seekable
+        self.author = track.author
+        self.duration = track.duration
+        self.is_stream = track.is_stream
+        self.title = track.title
+        self.uri = track.uri
+        self.artwork_url = None
+        self.isrc = None
+        self.position = 0
+        self.source_name = track.source_name
+        self.plugin_info = None
+        self.user_data = None
+        # Entries of the same request share one context
+        self.extra = extra
+        self._loading: asyncio.Task | None = None
+
+    def prefetch(self, client: lavalink.Client):
+        if self.track is None and self._loading is None:
+            self._loading = asyncio.create_task(self.resolve(client))
+            self._loading.add_done_callback(self._resolved)
+
+    def _resolved(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[LazyTrack] Failed to resolve {self.uri}: {task.exception()}")
+            self._loading = None
+
+    async def resolve(self, client: lavalink.Client) -> str | None:
+        results = await client.get_tracks(self.uri)
+        if results.load_type in (LoadType.EMPTY, LoadType.ERROR) or not results.tracks:
+            return None
+        track = next((track for track in results.tracks if track.identifier == self.identifier), results.tracks[0])
+        self.track = track.track
+        return self.track
+
+    async def load(self, client: lavalink.Client) -> str | None:
+        if self.track is not None:
+            return self.track
+        self.prefetch(client)
+        try:
+            return await asyncio.shield(self._loading)
+        except Exception:
+            return None
+
+
+class TrackQueue(list):
+    def __init__(self, tracks: Iterable[AudioTrack] = ()):
+        super().__init__(tracks)
+        self.duration = 0
+        self.streams = 0
+        self.requesters: Counter[int] = Counter()
+        self.version = next(_versions)
+        for track in self:
+            self._added(track)
+
+    def _added(self, track: AudioTrack):
+        if track.stream:
+            self.streams += 1
+        else:
+            self.duration += track.duration
+        self.requesters[track.requester] += 1
+
+    def _removed(self, track: AudioTrack):
+        if track.stream:
+            self.streams -= 1
+        else:
+            self.duration -= track.duration
+        self.requesters[track.requester] -= 1
+        if self.requesters[track.requester] <= 0:
+            del self.requesters[track.requester]
+
+    def _changed(self):
+        self.version = next(_versions)
+
+    def append(self, track: AudioTrack):
+        super().append(track)
+        self._added(track)
+        self._changed()
+
+    def insert(self, index: int, track: AudioTrack):
+        super().insert(index, track)
+        self._added(track)
+        self._changed()
+
+    def extend(self, tracks: Iterable[AudioTrack]):
+        tracks = list(tracks)
+        super().extend(tracks)
+        for track in tracks:
+            self._added(track)
+        self._changed()
+
+    def __iadd__(self, tracks: Iterable[AudioTrack]):
+        self.extend(tracks)
+        return self
+
+    def pop(self, index: int = -1) -> AudioTrack:
+        track = super().pop(index)
+        self._removed(track)
+        self._changed()
+        return track
+
+    def remove(self, track: AudioTrack):
+        super().remove(track)
+        self._removed(track)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self.duration = 0
+        self.streams = 0
+        self.requesters.clear()
+        self._changed()
+
+    def __setitem__(self, index, value):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        super().__setitem__(index, value)
+        added = self[index] if isinstance(index, slice) else [self[index]]
+        for track in removed:
+            self._removed(track)
+        for track in added:
+            self._added(track)
+        self._changed()
+
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        super().__delitem__(index)
+        for track in removed:
+            self._removed(track)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
+class Player(lavalink.DefaultPlayer):
+    def __init__(self, guild_id: int, node: lavalink.Node):
+        self._pages: dict[tuple, str] = {}
+        self._pages_key: tuple | None = None
+        super().__init__(guild_id, node)
+
+    @property
+    def queue(self) -> TrackQueue:
+        return self._queue
+
+    @queue.setter
+    def queue(self, tracks: Iterable[AudioTrack]):
+        # Replacing the queue (e.g. filtering it) keeps the totals consistent
+        self._queue = tracks if isinstance(tracks, TrackQueue) else TrackQueue(tracks)
+
+    @property
+    def pages_state(self) -> tuple:
+        return self._queue.version, self.current
+
+    def get_page(self, key: tuple) -> str | None:
+        state = self.pages_state
+        if state != self._pages_key:
+            self._pages.clear()
+            self._pages_key = state
+            return None
+        return self._pages.get(key)
+
+    def set_page(self, state: tuple, key: tuple, content: str):
+        # A page rendered before the queue changed must not be served afterwards
+        if state == self._pages_key:
+            self._pages[key] = content
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from lavalink import AudioTrack
+
+logger = logging.getLogger("bot.rollups")
+
+PERIODS = ("hour", "day")
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    if period == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollupWriter:
+    def __init__(self, database, *, flush_interval: float = 30):
+        self.database = database
+        self.flush_interval = flush_interval
+        self._guilds: defaultdict[tuple[int, str, datetime], Counter] = defaultdict(Counter)
+        self._tracks: defaultdict[tuple[int, str, datetime, str, str], int] = defaultdict(int)
+        self._titles: dict[tuple[str, str], str] = {}
+        self._pending: tuple[ObjectId, list[tuple], list[tuple]] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        try:
+            await self.database.create_rollup_indexes()
+        except Exception:
+            logger.exception("[Rollups] Failed to create rollup indexes")
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._pending is not None:
+            logger.warning("[Rollups] Dropped rollups that could not be written before shutdown")
+
+    def record(self, guild_id: int, track: AudioTrack, played_at: datetime | None = None):
+        played_at = played_at or datetime.now(timezone.utc)
+        self._titles[(track.source_name, track.identifier)] = track.title
+        for period in PERIODS:
+            start = bucket_start(played_at, period)
+            counts = self._guilds[(guild_id, period, start)]
+            counts["plays"] += 1
+            counts[str(track.requester)] += 1
+            self._tracks[(guild_id, period, start, track.source_name, track.identifier)] += 1
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        while True:
+            if self._pending is None:
+                if not self._guilds and not self._tracks:
+                    return
+                self._pending = self.take_batch()
+
+            # A batch keeps its flush id until every rollup in it landed, whatever the outcome of a failed write was,
+            # so the database can skip the increments that already went through
+            flush_id, guild_rollups, track_rollups = self._pending
+            guild_rollups = await self.apply(self.database.apply_guild_rollups, flush_id, guild_rollups)
+            track_rollups = await self.apply(self.database.apply_track_rollups, flush_id, track_rollups)
+            if guild_rollups or track_rollups:
+                # Newer counts keep accumulating in memory until the pending batch is written
+                self._pending = (flush_id, guild_rollups, track_rollups)
+                return
+            self._pending = None
+
+    def take_batch(self) -> tuple[ObjectId, list[tuple], list[tuple]]:
+        guilds, self._guilds = self._guilds, defaultdict(Counter)
+        tracks, self._tracks = self._tracks, defaultdict(int)
+        titles, self._titles = self._titles, {}
+
+        guild_rollups = []
+        for (guild_id, period, start), counts in guilds.items():
+            plays = counts.pop("plays")
+            guild_rollups.append((guild_id, period, start, plays, dict(counts)))
+
+        track_rollups = [
+            (guild_id, period, start, source_name, identifier, titles.get((source_name, identifier)), plays)
+            for (guild_id, period, start, source_name, identifier), plays in tracks.items()
+        ]
+        return ObjectId(), guild_rollups, track_rollups
+
+    async def apply(self, write, flush_id: ObjectId, rollups: list[tuple]) -> list[tuple]:
+        if not rollups:
+            return []
+        try:
+            failed = [rollups[index] for index in await write(flush_id, rollups)]
+        except Exception:
+            logger.exception("[Rollups] Failed to write rollups, retrying the batch on the next flush")
+            return rollups
+        if failed:
+            logger.warning(
+                f"[Rollups] Failed to write {len(failed)} of {len(rollups)} rollups, retrying them on the next flush"
+            )
+        return failed
@@ -0,0 +1,73 @@
+import asyncio
+import gc
+import json
+import logging
+from typing import Any, Literal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("bot.runtime")
+
+Profile = Literal["default", "performance"]
+
+_profile: Profile = "default"
+_fast_json = False
+_frozen = False
+
+
+def configure(profile: Profile, *, gc_thresholds: tuple[int, int, int] = (700, 10, 10)) -> dict[str, Any]:
+    # Has to run before the event loop is created
+    global _profile, _fast_json
+    _profile = profile
+    _fast_json = False
+    if profile != "performance":
+        return {"profile": profile}
+
+    try:
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        loop = "uvloop"
+    except ImportError:
+        logger.warning("[Runtime] uvloop is not installed, keeping the default event loop")
+        loop = "asyncio"
+
+    if orjson is not None:
+        _fast_json = True
+    else:
+        logger.warning("[Runtime] orjson is not installed, keeping the standard json module")
+
+    # Fewer young collections, the long-lived objects they would scan are frozen after startup anyway
+    gc.set_threshold(*gc_thresholds)
+    return {
+        "profile": profile,
+        "loop": loop,
+        "json": "orjson" if _fast_json else "json",
+        "gc_thresholds": gc_thresholds,
+    }
+
+
+def freeze():
+    # Only the startup objects are frozen, on_ready also runs on every reconnect
+    global _frozen
+    if _profile != "performance" or _frozen:
+        return
+    _frozen = True
+    gc.collect()
+    gc.freeze()
+    logger.info(f"[Runtime] Froze {gc.get_freeze_count()} startup objects")
+
+
+def loads(data: str | bytes) -> Any:
+    if _fast_json:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    if _fast_json:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import discord  # noqa: E402
+from discord import app_commands  # noqa: E402
+
+from translator import Translator  # noqa: E402
+
+# fmt: off
+CASES = [
+    ("message.player.paused", {}),
+    ("message.player.set_volume", {"emoji": "<:volume_up:1>", "level": 50}),
+    ("message.queue.track_added", {"name": "Never Gonna Give You Up"}),
+    ("message.nodes.unavailable", {}),
+]
+# fmt: on
+
+EMOJIS = {name: f"<:{name}:{index}>" for index, name in enumerate(["pause", "play_arrow", "skip_next", "stop"])}
+
+
+# Per-call path used before translation tables were compiled at load time
+class LegacyTranslator(Translator):
+    def _get(self, key: str, language_code: str) -> str | None:
+        if language_code not in self.locales:
+            return
+        return self._translations.get(language_code).get(key)
+
+    def _get_language_code(self, locale: discord.Locale) -> str:
+        language_code = locale.language_code
+        if language_code not in self.locales:
+            return self.default_locale
+        return language_code
+
+    async def translate(self, string, locale, context):
+        extras = string.extras
+        key = extras.get("key")
+        if not key:
+            return string.message
+        lang = self._get_language_code(locale)
+        translation = self._get(key, lang) or self._get(key, self.default_locale)
+        if translation is None:
+            return string.message
+        translation = await asyncio.to_thread(self.replace_emojis, translation)
+        try:
+            translation = translation.format(**extras)
+        except KeyError:
+            pass
+        return translation
+
+
+async def measure(translator: Translator, strings: list[app_commands.locale_str], locale, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for string in strings:
+            await translator.translate(string, locale, None)
+    return (time.perf_counter() - start) / (iterations * len(strings))
+
+
+async def run(locale_dir: str, iterations: int):
+    bot = SimpleNamespace(application_emojis=EMOJIS)
+    strings = [app_commands.locale_str("", key=key, **extras) for key, extras in CASES]
+
+    for locale in (discord.Locale.korean, discord.Locale.american_english, discord.Locale.japanese):
+        results = {}
+        for name, cls in (("legacy", LegacyTranslator), ("compiled", Translator)):
+            translator = cls(bot, locale_dir=locale_dir)
+            await translator.load()
+            await measure(translator, strings, locale, max(iterations // 10, 1))
+            results[name] = await measure(translator, strings, locale, iterations)
+
+        speedup = results["legacy"] / results["compiled"]
+        print(
+            f"{locale.value:>6}: legacy {results['legacy'] * 1e6:8.2f} us/call, "
+            f"compiled {results['compiled'] * 1e6:8.2f} us/call ({speedup:.1f}x)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("path", nargs="?", default="./locales", help="Path to the locale directory")
+    parser.add_argument("-n", "--iterations", type=int, default=2000, help="Number of iterations per case")
+
+    args = parser.parse_args()
+
+    asyncio.run(run(args.path, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
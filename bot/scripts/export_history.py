@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import json
+import os
+import sys
+import typing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import (  # noqa: E402
+    PlaybackHistory,
+    PlayCommandHistory,
+    QueryHistory,
+    Track,
+)
+
+COLLECTIONS = {
+    "playback_history": (PlaybackHistory, "played_at"),
+    "play_command_history": (PlayCommandHistory, "created_at"),
+    "query_history": (QueryHistory, "created_at"),
+    # History documents reference these by _id, so they are exported whole and never pruned
+    "tracks": (Track, None),
+}
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def parse_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def load_checkpoint(output: Path) -> dict[str, dict]:
+    path = output / CHECKPOINT_FILE
+    if not path.is_file():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(output: Path, checkpoint: dict[str, dict]):
+    path = output / CHECKPOINT_FILE
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+def build_filter(
+    time_field: str | None, after: ObjectId | str | None, since: datetime | None, until: datetime | None
+) -> dict:
+    # The _id carries the insertion time, so the range is narrowed on the _id index before the time field is checked
+    id_range = {}
+    if after is not None:
+        id_range["$gt"] = after
+    elif since is not None:
+        id_range["$gte"] = ObjectId.from_datetime(since)
+    if until is not None:
+        # ObjectIds only keep whole seconds, the time field below trims the extra second
+        id_range["$lt"] = ObjectId.from_datetime(until + timedelta(seconds=1))
+
+    query = {"_id": id_range} if id_range else {}
+    time_range = {}
+    if since is not None:
+        time_range["$gte"] = since
+    if until is not None:
+        time_range["$lt"] = until
+    if time_range:
+        query[time_field] = time_range
+    return query
+
+
+class JsonlWriter:
+    suffix = ".jsonl.gz"
+
+    def __init__(self, path: Path, model: type):
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, documents: list[dict]):
+        for document in documents:
+            self.file.write(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS))
+            self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    suffix = ".parquet"
+
+    def __init__(self, path: Path, model: type):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("error: parquet output requires pyarrow, install it or use --format jsonl")
+
+        self.pyarrow = pyarrow
+        self.columns = []
+        schema = []
+        # The schema comes from the model, so every part has the same columns even when a batch is all nulls
+        for name, hint in typing.get_type_hints(model).items():
+            if hint is int:
+                column_type = pyarrow.int64()
+            elif hint is datetime:
+                column_type = pyarrow.timestamp("ms", tz="UTC")
+            else:
+                column_type = pyarrow.string()
+            self.columns.append((name, hint))
+            schema.append((name, column_type))
+        self.schema = pyarrow.schema(schema)
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+
+    def convert(self, value, hint):
+        if value is None or hint is int or hint is datetime:
+            return value
+        if isinstance(value, (list, dict)):
+            return json_util.dumps(value, json_options=json_util.RELAXED_JSON_OPTIONS)
+        return str(value)
+
+    def write(self, documents: list[dict]):
+        columns = {
+            name: [self.convert(document.get(name), hint) for document in documents] for name, hint in self.columns
+        }
+        # Each batch becomes one row group, which bounds the memory to a single batch
+        self.writer.write_table(self.pyarrow.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def export_collection(
+    client: MongoClient,
+    database: str,
+    name: str,
+    output: Path,
+    checkpoint: dict[str, dict],
+    *,
+    writer_cls: type,
+    since: datetime | None,
+    until: datetime | None,
+    batch_size: int,
+    part_size: int,
+    prune: bool,
+):
+    model, time_field = COLLECTIONS[name]
+    if time_field is None:
+        since = until = None
+        prune = False
+    collection = client[database][name]
+    directory = output / name
+    directory.mkdir(parents=True, exist_ok=True)
+
+    state = checkpoint.setdefault(name, {"last_id": None, "parts": 0, "documents": 0})
+    exported = 0
+    while True:
+        after = json_util.loads(state["last_id"]) if state["last_id"] else None
+        query = build_filter(time_field, after, since, until)
+        cursor = collection.find(query, sort=[("_id", ASCENDING)], batch_size=batch_size, limit=part_size)
+
+        part_index = state["parts"]
+        part_path = directory / f"part-{part_index:05d}{writer_cls.suffix}"
+        tmp_path = part_path.with_name(part_path.name + ".tmp")
+        writer = None
+        first_id = last_id = None
+        count = 0
+        try:
+            batch = []
+            for document in cursor:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    writer = writer or writer_cls(tmp_path, model)
+                    writer.write(batch)
+                    count += len(batch)
+                    first_id = first_id or batch[0]["_id"]
+                    last_id = batch[-1]["_id"]
+                    batch = []
+            if batch:
+                writer = writer or writer_cls(tmp_path, model)
+                writer.write(batch)
+                count += len(batch)
+                first_id = first_id or batch[0]["_id"]
+                last_id = batch[-1]["_id"]
+        finally:
+            cursor.close()
+            if writer is not None:
+                writer.close()
+
+        if count == 0:
+            break
+
+        # A part only counts once it is renamed into place, an interrupted run rewrites it from the checkpoint
+        tmp_path.replace(part_path)
+        state["last_id"] = json_util.dumps(last_id)
+        state["parts"] = part_index + 1
+        state["documents"] += count
+        save_checkpoint(output, checkpoint)
+        exported += count
+        print(f"info: {name}: wrote {count} documents to {part_path}")
+
+        if prune:
+            query = build_filter(time_field, None, since, until)
+            query["_id"] = {"$gte": first_id, "$lte": last_id}
+            result = collection.delete_many(query)
+            print(f"info: {name}: pruned {result.deleted_count} archived documents")
+
+        if count < part_size:
+            break
+
+    print(f"info: {name}: {exported} documents exported, {state['documents']} in total")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("output", nargs="?", default="./exports", help="Directory for the exported parts")
+    parser.add_argument(
+        "--collection",
+        action="append",
+        choices=list(COLLECTIONS),
+        help="Collection to export, can be repeated (default: all)",
+    )
+    parser.add_argument("--format", choices=list(WRITERS), default="jsonl", help="Output format")
+    parser.add_argument("--since", type=parse_time, help="Only export documents from this ISO time (UTC by default)")
+    parser.add_argument("--until", type=parse_time, help="Only export documents before this ISO time")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents fetched and written per batch")
+    parser.add_argument("--part-size", type=int, default=100000, help="Documents per output file")
+    parser.add_argument("--prune", action="store_true", help="Delete the documents once their part is written")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and export from the start")
+    parser.add_argument("--host", default=os.environ.get("DATABASE_HOST", "mongodb"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("DATABASE_PORT", 27017)))
+    parser.add_argument("--username", default=os.environ.get("DATABASE_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("DATABASE_PASSWORD"))
+    parser.add_argument("--database", default=os.environ.get("DATABASE_NAME", "database"))
+
+    args = parser.parse_args()
+
+    if args.prune and args.until is None:
+        print("error: --prune requires --until, so documents still being written are never deleted")
+        sys.exit(1)
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    checkpoint = {} if args.restart else load_checkpoint(output)
+    writer_cls = WRITERS[args.format]
+
+    client = MongoClient(
+        host=args.host, port=args.port, username=args.username, password=args.password, authSource="admin"
+    )
+    try:
+        for name in args.collection or COLLECTIONS:
+            export_collection(
+                client,
+                args.database,
+                name,
+                output,
+                checkpoint,
+                writer_cls=writer_cls,
+                since=args.since,
+                until=args.until,
+                batch_size=args.batch_size,
+                part_size=args.part_size,
+                prune=args.prune,
+            )
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
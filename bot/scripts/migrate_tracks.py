@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import bson
+from pymongo import MongoClient, UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import track_id  # noqa: E402
+
+HISTORY_COLLECTIONS = ("play_command_history", "playback_history")
+TRACK_FIELDS = ("source_name", "identifier", "title", "author", "duration", "uri")
+
+
+class Report:
+    def __init__(self):
+        self.documents = dict.fromkeys(HISTORY_COLLECTIONS, 0)
+        self.before = dict.fromkeys(HISTORY_COLLECTIONS, 0)
+        self.after = dict.fromkeys(HISTORY_COLLECTIONS, 0)
+        self.tracks: dict[str, bool] = {}
+        self.tracks_size = 0
+
+    def add(self, collection: str, before: dict, after: dict):
+        self.documents[collection] += 1
+        self.before[collection] += len(bson.encode(before))
+        self.after[collection] += len(bson.encode(after))
+
+    def add_track(self, document: dict) -> bool:
+        # A track is written once, and again when a later copy has the encoded track or metadata the first lacked
+        complete = document["track"] is not None and all(document[name] is not None for name in TRACK_FIELDS)
+        known = self.tracks.get(document["_id"])
+        if known is None:
+            self.tracks_size += len(bson.encode(document))
+        elif known or not complete:
+            return False
+        self.tracks[document["_id"]] = complete
+        return True
+
+    def print(self):
+        print(f"{'collection':<24}{'documents':>12}{'before':>14}{'after':>14}")
+        for collection in HISTORY_COLLECTIONS:
+            print(
+                f"{collection:<24}{self.documents[collection]:>12}"
+                f"{format_size(self.before[collection]):>14}{format_size(self.after[collection]):>14}"
+            )
+        print(f"{'tracks':<24}{len(self.tracks):>12}{'':>14}{format_size(self.tracks_size):>14}")
+
+        before = sum(self.before.values())
+        after = sum(self.after.values()) + self.tracks_size
+        saved = 1 - after / before if before else 0
+        print(f"{'total':<24}{'':>12}{format_size(before):>14}{format_size(after):>14}  ({saved:.1%} smaller)")
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def track_document(data: dict) -> dict:
+    document = {"_id": track_id(data["source_name"], data["identifier"])}
+    for name in TRACK_FIELDS:
+        document[name] = data.get(name)
+    document["track"] = data.get("track")
+    return document
+
+
+def track_update(document: dict) -> UpdateOne:
+    # Mirrors Database.save_tracks, a later copy of a track fills in the metadata the first one was missing
+    fields = {
+        name: {"$ifNull": [f"${name}", {"$literal": value}]}
+        for name, value in document.items()
+        if name not in ("_id", "track")
+    }
+    if document["track"] is not None:
+        fields["track"] = {"$literal": document["track"]}
+    return UpdateOne({"_id": document["_id"]}, [{"$set": fields}], upsert=True)
+
+
+def migrate(database, report: Report, *, batch_size: int, dry_run: bool):
+    # Only documents in the old layout are selected, so an interrupted migration simply continues on the next run
+    sources = {
+        "play_command_history": {"tracks.0": {"$type": "object"}},
+        "playback_history": {"track": {"$exists": True}},
+    }
+    tracks = database["tracks"]
+    for collection_name, query in sources.items():
+        collection = database[collection_name]
+        track_requests: list[UpdateOne] = []
+        history_requests: list[UpdateOne] = []
+
+        def write():
+            if dry_run:
+                track_requests.clear()
+                history_requests.clear()
+                return
+            # Tracks go first, a history document never references a track that was not written
+            if track_requests:
+                tracks.bulk_write(track_requests, ordered=False)
+                track_requests.clear()
+            if history_requests:
+                collection.bulk_write(history_requests, ordered=False)
+                history_requests.clear()
+
+        for document in collection.find(query, batch_size=batch_size):
+            if collection_name == "play_command_history":
+                entries = document["tracks"]
+                update = {"$set": {"tracks": [track_id(t["source_name"], t["identifier"]) for t in entries]}}
+                migrated = {**document, **update["$set"]}
+            else:
+                entries = [document]
+                update = {"$unset": {"track": "", "uri": ""}}
+                migrated = {k: v for k, v in document.items() if k not in ("track", "uri")}
+
+            for entry in entries:
+                track = track_document(entry)
+                if report.add_track(track):
+                    track_requests.append(track_update(track))
+            history_requests.append(UpdateOne({"_id": document["_id"]}, update))
+            report.add(collection_name, document, migrated)
+
+            if len(history_requests) >= batch_size:
+                write()
+        write()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move the tracks embedded in the history documents into the tracks collection"
+    )
+
+    parser.add_argument("--dry-run", action="store_true", help="Only report the storage the migration would save")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents updated per bulk write")
+    parser.add_argument("--host", default=os.environ.get("DATABASE_HOST", "mongodb"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("DATABASE_PORT", 27017)))
+    parser.add_argument("--username", default=os.environ.get("DATABASE_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("DATABASE_PASSWORD"))
+    parser.add_argument("--database", default=os.environ.get("DATABASE_NAME", "database"))
+
+    args = parser.parse_args()
+
+    client = MongoClient(
+        host=args.host, port=args.port, username=args.username, password=args.password, authSource="admin"
+    )
+    report = Report()
+    try:
+        migrate(client[args.database], report, batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        client.close()
+
+    print(f"info: {'estimated' if args.dry_run else 'migrated'} document sizes (BSON, before compression)")
+    report.print()
+
+
+if __name__ == "__main__":
+    main()
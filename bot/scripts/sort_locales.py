@@ -1,7 +1,18 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import marshal
+import sys
 from pathlib import Path
+from string import Formatter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from translator import (  # noqa: E402
+    BUNDLE_VERSION,
+    DEFAULT_LOCALE,
+    validate_locale,
+)
 
 
 def sort_json_file(file_path: Path):
@@ -35,15 +46,98 @@ def sort(path: Path):
         print(f"error: path {path} does not exist")
 
 
+def placeholders(text: str) -> set[str]:
+    return {field_name for _, field_name, _, _ in Formatter().parse(text) if field_name is not None}
+
+
+def load_locales(path: Path) -> dict[str, dict[str, str]] | None:
+    if not path.is_dir():
+        print(f"error: {path} is not a directory")
+        return None
+
+    locales = {}
+    failed = False
+    for file in sorted(path.glob("*.json")):
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            validate_locale(data)
+        except Exception as e:
+            print(f"error: {file}: {e}")
+            failed = True
+            continue
+        locales[file.stem] = data
+    return None if failed else locales
+
+
+def check(locales: dict[str, dict[str, str]], default_locale: str) -> bool:
+    if default_locale not in locales:
+        print(f"error: default locale {default_locale} not found")
+        return False
+
+    default = locales[default_locale]
+    ok = True
+    for lang, data in locales.items():
+        if lang == default_locale:
+            continue
+
+        missing = default.keys() - data.keys()
+        if missing:
+            print(f"warning: {lang} is missing {len(missing)} key(s), falling back to {default_locale}")
+
+        for key in sorted(data.keys() - default.keys()):
+            print(f"error: {lang}: {key} does not exist in {default_locale}")
+            ok = False
+
+        for key in sorted(data.keys() & default.keys()):
+            expected = placeholders(default[key])
+            actual = placeholders(data[key])
+            for name in sorted(expected - actual):
+                print(f"error: {lang}: {key} is missing placeholder {{{name}}}")
+                ok = False
+            for name in sorted(actual - expected):
+                print(f"error: {lang}: {key} has unknown placeholder {{{name}}}")
+                ok = False
+    return ok
+
+
+def build(path: Path, output: Path, default_locale: str) -> bool:
+    locales = load_locales(path)
+    if locales is None or not check(locales, default_locale):
+        print("error: locale check failed, bundle not written")
+        return False
+
+    bundle = marshal.dumps({"version": BUNDLE_VERSION, "locales": locales})
+    tmp_output = output.with_suffix(".tmp")
+    tmp_output.write_bytes(bundle)
+    tmp_output.replace(output)
+
+    print(f"info: {len(locales)} locales bundled into {output} ({len(bundle)} bytes)")
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser()
 
     parser.add_argument("path", nargs="?", default="./locales", help="Path to the locale directory or file")
+    parser.add_argument("--no-sort", action="store_true", help="Do not rewrite the json files")
+    parser.add_argument("--check", action="store_true", help="Check key parity and format placeholders")
+    parser.add_argument("--bundle", metavar="OUTPUT", help="Check the locales and write a precompiled bundle")
+    parser.add_argument("--default-locale", default=DEFAULT_LOCALE, help="Locale the others are checked against")
 
     args = parser.parse_args()
 
     path = Path(args.path)
-    sort(path)
+    if not args.no_sort:
+        sort(path)
+
+    if args.bundle:
+        if not build(path, Path(args.bundle), args.default_locale):
+            sys.exit(1)
+    elif args.check:
+        locales = load_locales(path)
+        if locales is None or not check(locales, args.default_locale):
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from lavalink import AudioTrack
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+class SearchCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, list[AudioTrack]]] = OrderedDict()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def _get(self, key: str) -> list[AudioTrack] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, tracks = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return tracks
+
+    def get(self, query: str) -> list[AudioTrack] | None:
+        tracks = self._get(normalize_query(query))
+        if tracks is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return tracks
+
+    def lookup(self, query: str) -> list[AudioTrack] | None:
+        # Falls back to the longest cached prefix whose results still match the query
+        key = normalize_query(query)
+        tracks = self._get(key)
+        if tracks is not None:
+            self.hits += 1
+            return tracks
+
+        words = key.split()
+        for end in range(len(key) - 1, 0, -1):
+            tracks = self._get(key[:end].rstrip())
+            if tracks is None:
+                continue
+            matches = [track for track in tracks if all(word in track.title.casefold() for word in words)]
+            if matches:
+                self.prefix_hits += 1
+                return matches
+            break
+
+        self.misses += 1
+        return None
+
+    def put(self, query: str, tracks: list[AudioTrack]):
+        key = normalize_query(query)
+        self._entries[key] = (time.monotonic() + self.ttl, tracks)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Only the last call per key within the delay goes through, so keystroke bursts collapse into one lookup
+class Debouncer:
+    def __init__(self, delay: float = 0.3):
+        self.delay = delay
+        self._latest: dict[int, object] = {}
+
+    async def wait(self, key: int) -> bool:
+        token = object()
+        self._latest[key] = token
+        await asyncio.sleep(self.delay)
+        if self._latest.get(key) is not token:
+            return False
+        del self._latest[key]
+        return True
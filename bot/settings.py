@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -18,6 +20,56 @@ class Settings(BaseSettings):
     LAVALINK_NAME: str = "default-node"
 
     MAX_VOLUME: int = 100
+    SPECULATIVE_VOICE_CONNECT: bool = True
+    LAZY_QUEUE_THRESHOLD: int = 50
+    QUEUE_PREFETCH: int = 3
+
+    AUTOPLAY: bool = False
+    AUTOPLAY_TOP_K: int = 10
+    AUTOPLAY_SAVE_INTERVAL: float = 60
+
+    SEARCH_CACHE_SIZE: int = 1024
+    SEARCH_CACHE_TTL: float = 600
+    SEARCH_DEBOUNCE: float = 0.3
+    SEARCH_AUTOCOMPLETE_TIMEOUT: float = 2.0
+
+    ADMISSION_MAX_CPU_LOAD: float = 0.9
+    ADMISSION_MAX_FRAME_DEFICIT: float = 0.05
+    ADMISSION_LARGE_PLAYLIST: int = 100
+    ADMISSION_STATS_INTERVAL: float = 10.0
+
+    HISTORY_SPOOL_PATH: str = "spool/history.spool"
+    HISTORY_SPOOL_FSYNC_INTERVAL: float = 0.05
+    HISTORY_WRITE_TIMEOUT: float = 2.0
+    HISTORY_REPLAY_INTERVAL: float = 10.0
+
+    ROLLUP_FLUSH_INTERVAL: float = 30
+    STATS_DAYS: int = 7
+
+    SHUTDOWN_CONCURRENCY: int = 16
+    SHUTDOWN_TIMEOUT: float = 20.0
+
+    TRANSLATION_CACHE_SIZE: int = 1024
+    LOCALE_RELOAD_INTERVAL: float = 5.0
+
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_ROTATE_INTERVAL: float = 24 * 60 * 60
+
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9100
+
+    LOOP_MONITOR_INTERVAL: float = 0.25
+    LOOP_LAG_THRESHOLD: float = 0.5
+    LOOP_LAG_REPORT_COOLDOWN: float = 60
+
+    TRACE_PATH: str = "logs/traces.jsonl"
+    TRACE_SAMPLE_RATE: float = 0.0
+
+    RUNTIME_PROFILE: Literal["default", "performance"] = "default"
+    GC_THRESHOLDS: tuple[int, int, int] = (50_000, 20, 100)
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
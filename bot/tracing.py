@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import runtime
+
+logger = logging.getLogger("bot.tracing")
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "attributes")
+
+    def __init__(self, name: str, start: float, attributes: dict[str, Any]):
+        self.name = name
+        self.start = start
+        self.end: float | None = None
+        self.attributes = attributes
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+
+class Trace:
+    __slots__ = ("trace_id", "name", "attributes", "start", "started_at", "spans", "finished")
+
+    def __init__(self, trace_id: int, name: str, attributes: dict[str, Any]):
+        self.trace_id = trace_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+        self.spans: list[Span] = []
+        self.finished = False
+
+    def start_span(self, name: str, *, start: float | None = None, **attributes) -> Span:
+        span = Span(name, time.perf_counter() if start is None else start, attributes)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        finally:
+            span.finish()
+
+    def to_dict(self, end: float) -> dict[str, Any]:
+        return {
+            "trace_id": str(self.trace_id),
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            **self.attributes,
+            "spans": [
+                {
+                    "name": span.name,
+                    "offset_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": round(((span.end or end) - span.start) * 1000, 3),
+                    **span.attributes,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+class Tracer:
+    def __init__(self, path: str = "logs/traces.jsonl", *, sample_rate: float = 0.0, flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def configure(self, path: str, *, sample_rate: float):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+
+    def start_trace(self, trace_id: int, name: str, **attributes) -> Trace | None:
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        return Trace(trace_id, name, attributes)
+
+    def finish(self, trace: Trace | None):
+        if trace is None or trace.finished:
+            return
+        trace.finished = True
+        self._buffer.append(runtime.dumps(trace.to_dict(time.perf_counter())))
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def write(self, lines: list[str]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self.write, lines)
+        except Exception:
+            logger.exception("[Tracing] Failed to write traces")
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def close(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def get_trace(interaction) -> Trace | None:
+    return interaction.extras.get("trace")
+
+
+def start_span(trace: Trace | None, name: str, **attributes) -> Span | _NullSpan:
+    if trace is None:
+        return NULL_SPAN
+    return trace.start_span(name, **attributes)
+
+
+def span(trace: Trace | None, name: str, **attributes):
+    if trace is None:
+        return nullcontext(NULL_SPAN)
+    return trace.span(name, **attributes)
+
+
+tracer = Tracer()
+
+
+def finish_track(track, outcome: str):
+    # A trace handed to a queued track is normally closed when it starts, this closes it when it never does
+    if track is None:
+        return
+    trace = track.extra.pop("trace", None)
+    if trace is not None:
+        trace.attributes["outcome"] = outcome
+        tracer.finish(trace)
@@ -1,62 +1,237 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
+import marshal
 import re
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import TYPE_CHECKING
+from string import Formatter
+from typing import TYPE_CHECKING, Any, Hashable, Mapping
 
 import discord
 from discord import app_commands
 
+import runtime
+
 if TYPE_CHECKING:
     from bot import Bot
 
 DEFAULT_LOCALE = "ko-KR"
+BUNDLE_VERSION = 1
 
 logger = logging.getLogger("bot.translator")
 
+_formatter = Formatter()
+
+
+def validate_locale(data: Any):
+    if not isinstance(data, dict):
+        raise ValueError("Locale bundle must be a JSON object")
+
+    for key, value in data.items():
+        if not isinstance(value, str):
+            raise ValueError(f"Translation for {key!r} must be a string")
+        try:
+            list(_formatter.parse(value))
+        except ValueError as e:
+            raise ValueError(f"Translation for {key!r} is not a valid format string: {e}") from e
+
+
+class Template:
+    __slots__ = ("text", "fields", "static")
+
+    def __init__(self, text: str):
+        self.text: str = text
+        self.fields: tuple[str, ...] = tuple(
+            field_name for _, field_name, _, _ in _formatter.parse(text) if field_name is not None
+        )
+        # Formatted once, so escaped braces come out the same as through format_map
+        self.static: str | None = None if self.fields else text.format()
+
+    def render(self, kwargs: Mapping[str, Any]) -> str:
+        if self.static is not None:
+            return self.static
+        return self.text.format_map(kwargs)
+
+
+class RenderCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self._data: OrderedDict[Hashable, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: Hashable) -> str | None:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: str):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
 
 class Translator(app_commands.Translator):
-    def __init__(self, bot: Bot, *, locale_dir: str = "locales", default_locale: str = DEFAULT_LOCALE):
+    def __init__(
+        self,
+        bot: Bot,
+        *,
+        locale_dir: str = "locales",
+        bundle_path: str | None = None,
+        default_locale: str = DEFAULT_LOCALE,
+        cache_size: int = 1024,
+    ):
         self.bot: Bot = bot
         self.locale_dir = Path(locale_dir)
+        self.bundle_path = Path(bundle_path) if bundle_path else self.locale_dir / "locales.bundle"
         self.default_locale: str = default_locale
         self.emojis: dict[str, str] = self.bot.application_emojis
         self.emoji_pattern = re.compile(r":(\w+):")
         self._translations: dict[str, dict[str, str]] = {}
+        self._compiled: dict[str, dict[str, Template]] = {}
+        self._tables: dict[discord.Locale, dict[str, Template]] = {}
+        self._mtimes: dict[str, int] = {}
+        self._watch_task: asyncio.Task | None = None
+        self.cache = RenderCache(cache_size)
 
     @property
     def locales(self):
         return list(self._translations.keys())
 
-    def _get(self, key: str, language_code: str) -> str | None:
-        if language_code not in self.locales:
-            return
-        return self._translations.get(language_code).get(key)
-
-    def _get_language_code(self, locale: discord.Locale) -> str:
-        language_code = locale.language_code
-        if language_code not in self.locales:
-            return self.default_locale
-        return language_code
-
     async def load(self):
         if not self.locale_dir.is_dir():
             logger.error(f"[Locale] Directory not found: {self.locale_dir}")
             return
 
-        for path in self.locale_dir.glob("*.json"):
-            lang = path.stem
+        mtimes = await asyncio.to_thread(self.scan)
+        translations = await asyncio.to_thread(self.read_bundle, mtimes)
+        if translations is None:
+            translations = {}
+            for lang in mtimes:
+                try:
+                    translations[lang] = await asyncio.to_thread(self.read_locale, lang)
+                except Exception:
+                    logger.exception(f"[Locale] Failed to load translations for {lang}")
+
+        self._mtimes = mtimes
+        self.swap(translations)
+        logger.info(f"[Locale] Successfully loaded {len(self.locales)} languages")
+
+    async def unload(self):
+        self.stop_watching()
+
+        stats = self.cache.stats()
+        logger.info(
+            f"[Translation] Render cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate)"
+        )
+
+    def scan(self) -> dict[str, int]:
+        return {path.stem: path.stat().st_mtime_ns for path in self.locale_dir.glob("*.json")}
+
+    def read_locale(self, lang: str) -> dict[str, str]:
+        data = runtime.loads((self.locale_dir / f"{lang}.json").read_bytes())
+        validate_locale(data)
+        return data
+
+    def read_bundle(self, mtimes: dict[str, int]) -> dict[str, dict[str, str]] | None:
+        if not self.bundle_path.is_file():
+            return None
+
+        if mtimes and self.bundle_path.stat().st_mtime_ns < max(mtimes.values()):
+            logger.warning(f"[Locale] Bundle {self.bundle_path} is older than the json files, ignoring it")
+            return None
+
+        try:
+            bundle = marshal.loads(self.bundle_path.read_bytes())
+            if bundle.get("version") != BUNDLE_VERSION:
+                logger.warning(f"[Locale] Unsupported bundle version: {bundle.get('version')}")
+                return None
+            locales = bundle["locales"]
+            for data in locales.values():
+                validate_locale(data)
+        except Exception:
+            logger.exception(f"[Locale] Failed to read bundle {self.bundle_path}, falling back to json")
+            return None
+
+        logger.info(f"[Locale] Loaded {len(locales)} languages from bundle {self.bundle_path}")
+        return locales
+
+    def start_watching(self, interval: float):
+        if interval <= 0:
+            return
+        if self._watch_task is not None and not self._watch_task.done():
+            return
+        self._watch_task = asyncio.create_task(self.watch(interval))
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
             try:
-                with path.open(encoding="utf-8") as f:
-                    data = json.load(f)
-                self._translations[lang] = data
+                await self.check_for_changes()
             except Exception:
-                logger.exception(f"[Locale] Failed to load translations for {lang}")
+                logger.exception("[Locale] Failed to check locale files for changes")
 
-        logger.info(f"[Locale] Successfully loaded {len(self.locales)} languages")
+    async def check_for_changes(self):
+        mtimes = await asyncio.to_thread(self.scan)
+        changed = sorted(lang for lang, mtime in mtimes.items() if self._mtimes.get(lang) != mtime)
+        removed = sorted(self._mtimes.keys() - mtimes.keys())
+        self._mtimes = mtimes
+        if changed or removed:
+            await self.reload(changed, removed)
+
+    async def reload(self, changed: list[str], removed: list[str]):
+        start = time.perf_counter()
+
+        translations = {lang: data for lang, data in self._translations.items() if lang not in removed}
+        reloaded = set(removed)
+        for lang in changed:
+            try:
+                translations[lang] = await asyncio.to_thread(self.read_locale, lang)
+            except Exception:
+                logger.exception(f"[Locale] Rejected invalid bundle for {lang}, keeping the previous version")
+                continue
+            reloaded.add(lang)
+
+        if not reloaded:
+            return
+
+        self.swap(translations, reloaded)
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"[Locale] Reloaded {', '.join(sorted(reloaded))} in {elapsed:.1f}ms")
 
     def repl(self, match: re.Match) -> str:
         name = match.group(1)
@@ -66,6 +241,66 @@ class Translator(app_commands.Translator):
     def replace_emojis(self, text: str) -> str:
         return self.emoji_pattern.sub(self.repl, text)
 
+    def compile_locale(self, data: dict[str, str], default: dict[str, str]) -> dict[str, Template]:
+        # Resolve the fallback chain up front so a lookup never has to consult the default locale
+        merged = data if data is default else {**default, **data}
+        return {key: Template(self.replace_emojis(value)) for key, value in merged.items()}
+
+    def compile(self, translations: dict[str, dict[str, str]]) -> dict[str, dict[str, Template]]:
+        default = translations.get(self.default_locale, {})
+        return {lang: self.compile_locale(data, default) for lang, data in translations.items()}
+
+    def build_tables(self, compiled: dict[str, dict[str, Template]]) -> dict[discord.Locale, dict[str, Template]]:
+        fallback = compiled.get(self.default_locale, {})
+        return {locale: compiled.get(locale.language_code, fallback) for locale in discord.Locale}
+
+    def swap(self, translations: dict[str, dict[str, str]], changed: set[str] | None = None):
+        if changed is None or self.default_locale in changed:
+            compiled = self.compile(translations)
+        else:
+            default = translations.get(self.default_locale, {})
+            compiled = {lang: table for lang, table in self._compiled.items() if lang in translations}
+            for lang in changed:
+                if lang in translations:
+                    compiled[lang] = self.compile_locale(translations[lang], default)
+        tables = self.build_tables(compiled)
+
+        # Everything is built aside and assigned without yielding, so in-flight translations never see a mix
+        self._translations = translations
+        self._compiled = compiled
+        self._tables = tables
+        self.cache.clear()
+
+    def set_emojis(self, emojis: dict[str, str]):
+        self.emojis = emojis
+        self.swap(self._translations)
+
+    def render(self, key: str, locale: discord.Locale, kwargs: Mapping[str, Any]) -> str | None:
+        template = self._tables.get(locale, {}).get(key)
+        if template is None:
+            logger.warning(f"[Translation] Missing translation key: {key}")
+            return None
+
+        try:
+            return template.render(kwargs)
+        except KeyError:
+            logger.exception("[Translation] Failed to format: missing some key(s)")
+            return template.text
+
+    def render_cached(self, key: str, locale: discord.Locale, kwargs: Mapping[str, Any]) -> str | None:
+        cache_key = (key, locale, tuple(kwargs.items()))
+        try:
+            content = self.cache.get(cache_key)
+        except TypeError:
+            # Unhashable extras can't be cached, render them every time
+            return self.render(key, locale, kwargs)
+
+        if content is None:
+            content = self.render(key, locale, kwargs)
+            if content is not None:
+                self.cache.put(cache_key, content)
+        return content
+
     async def translate(
         self,
         string: app_commands.locale_str,
@@ -78,18 +313,7 @@ class Translator(app_commands.Translator):
         if not key:
             return string.message
 
-        lang = self._get_language_code(locale)
-
-        translation = self._get(key, lang) or self._get(key, self.default_locale)
+        translation = self.render_cached(key, locale, extras)
         if translation is None:
-            logger.warning(f"[Translation] Missing translation key: {key}")
             return string.message
-
-        translation = await asyncio.to_thread(self.replace_emojis, translation)
-
-        try:
-            translation = translation.format(**extras)
-        except KeyError:
-            logger.exception("[Translation] Failed to format: missing some key(s)")
-
         return translation
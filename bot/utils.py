@@ -1,6 +1,7 @@
 import logging
 import os
 import re
+import time
 from urllib.parse import urlparse
 
 import discord
@@ -8,22 +9,60 @@ from discord.app_commands import locale_str
 from discord.enums import InteractionResponseType
 from discord.utils import MISSING
 
+import metrics
+from translator import Translator
+
 URL_PATTERN = re.compile(r"^https?://", re.IGNORECASE)
 
 logger = logging.getLogger("bot.utils")
 logger.setLevel(logging.WARNING)
 
 
+async def translate(interaction: discord.Interaction, key: str, *, cached: bool = True, **kwargs) -> str:
+    translator = interaction.client.tree.translator
+    if isinstance(translator, Translator):
+        render = translator.render_cached if cached else translator.render
+        return render(key, interaction.locale, kwargs)
+    return await interaction.translate(locale_str("", key=key, **kwargs), locale=interaction.locale)
+
+
 async def send_message(
     interaction: discord.Interaction, key: str, *, view=MISSING, ephemeral: bool = False, silent: bool = False, **kwargs
 ):
-    content = await interaction.translate(locale_str("", key=key, **kwargs), locale=interaction.locale)
+    content = await translate(interaction, key, **kwargs)
+    return await send(interaction, content, view=view, ephemeral=ephemeral, silent=silent)
+
+
+async def send(
+    interaction: discord.Interaction,
+    content: str,
+    *,
+    view=MISSING,
+    ephemeral: bool = False,
+    silent: bool = False,
+    allowed_mentions=MISSING,
+):
     if not interaction.response.is_done():
-        return await interaction.response.send_message(content, view=view, ephemeral=ephemeral, silent=silent)
+        message = await interaction.response.send_message(
+            content, view=view, ephemeral=ephemeral, silent=silent, allowed_mentions=allowed_mentions
+        )
     else:
         if interaction.response.type == InteractionResponseType.deferred_channel_message and ephemeral is True:
             logger.warning("The ephemeral parameter is not supported for deferred interaction webhook messages")
-        return await interaction.followup.send(content, view=view, ephemeral=ephemeral, silent=silent)
+        message = await interaction.followup.send(
+            content, view=view, ephemeral=ephemeral, silent=silent, allowed_mentions=allowed_mentions
+        )
+    observe_first_reply(interaction)
+    return message
+
+
+def observe_first_reply(interaction: discord.Interaction):
+    extras = interaction.extras
+    started_at = extras.get("started_at")
+    if started_at is None or "replied_at" in extras or interaction.command is None:
+        return
+    extras["replied_at"] = time.perf_counter()
+    metrics.command_latency.labels(interaction.command.qualified_name).observe(extras["replied_at"] - started_at)
 
 
 def humans(channel: discord.VoiceChannel | discord.StageChannel) -> list[discord.Member]:
@@ -34,5 +73,13 @@ def is_url(url: str) -> bool:
     return URL_PATTERN.match(url.strip("<>")) is not None
 
 
+def format_duration(milliseconds: int) -> str:
+    minutes, seconds = divmod(milliseconds // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes}:{seconds:02}"
+
+
 def get_filename(url: str) -> str:
     return os.path.basename(urlparse(url).path)